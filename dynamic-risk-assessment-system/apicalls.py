@@ -7,13 +7,14 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def call_api_endpoints():
+def call_api_endpoints(config=None):
     """
     Function to call API endpoints and combine outputs
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
     output_model_path = config['output_model_path']
     test_data_path = config['test_data_path']
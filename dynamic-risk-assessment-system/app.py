@@ -1,30 +1,191 @@
 import pandas as pd
 import json
 import os
+import time
+import shutil
+import tempfile
+import itertools
 import logging
-from flask import Flask, request, jsonify
-from diagnostics import model_predictions, dataframe_summary, missing_data, execution_time, outdated_packages_list
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
+from diagnostics import (predict_with, dataframe_summary, missing_data, execution_time, outdated_packages_list,
+                         model_cache_stats, predict_file, prediction_cache_stats, load_deployed_model_version,
+                         dataset_statistics)
 import scoring
+from datastore import cached_dataset
+from release_store import current_release
+from stage_timing import timing_trends
+from snapshot_cache import SnapshotCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+api = Blueprint('api', __name__)
 
-@app.route("/prediction", methods=['POST', 'OPTIONS'])
+def preload(config):
+    """
+    Function to load the deployed model and the datasets into the process-wide caches before serving
+    
+    Missing files are logged and skipped, so a server can start before the first deployment.
+    """
+    start_time = time.time()
+    model_path = os.path.join(config['prod_deployment_path'], 'trainedmodel.pkl')
+    try:
+        _, model_hash = load_deployed_model_version(model_path)
+        logger.info(f"Preloaded model {model_hash[:12]}")
+    except FileNotFoundError:
+        logger.warning(f"No deployed model at {model_path} to preload")
+    
+    for folder, name in [(config['output_folder_path'], 'finaldata'), (config['test_data_path'], 'testdata')]:
+        try:
+            cached_dataset(folder, name, config)
+        except FileNotFoundError:
+            logger.warning(f"No {name} dataset in {folder} to preload")
+    
+    try:
+        dataset_statistics(config)
+    except FileNotFoundError:
+        pass
+    
+    logger.info(f"Preloaded serving state in {time.time() - start_time:.2f} seconds")
+
+def create_app(config=None, preload_state=True):
+    """
+    Function to create the API application with its configuration and serving state
+    
+    The model, datasets and dataset statistics live in process-wide caches
+    guarded by locks, so one process serves them to all of its threads, and a
+    server that forks workers after loading the app (gunicorn --preload)
+    shares them between workers. No background threads are started here;
+    the diagnostics snapshots start theirs on first use, after the fork.
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(api)
+    
+    # Expensive diagnostics are served from snapshots refreshed in the background, each with its own TTL
+    diagnostics_ttl = config.get('diagnostics_ttl', {})
+    diagnostics_cache = SnapshotCache()
+    diagnostics_cache.register('missing_data', lambda: missing_data(config), diagnostics_ttl.get('missing_data', 60))
+    diagnostics_cache.register('execution_time', lambda: execution_time(config),
+                               diagnostics_ttl.get('execution_time', 30))
+    diagnostics_cache.register('outdated_packages', lambda: outdated_packages_list(config),
+                               diagnostics_ttl.get('outdated_packages', 3600))
+    
+    flask_app.extensions['risk_assessment'] = {
+        'config': config,
+        # Rows scored at a time for streamed CSV uploads
+        'prediction_chunk_rows': config.get('prediction_chunk_rows', 10000),
+        'diagnostics_cache': diagnostics_cache
+    }
+    
+    if preload_state:
+        preload(config)
+    
+    return flask_app
+
+def serving_state():
+    """
+    Function to get the configuration and shared state of the application handling the request
+    """
+    return current_app.extensions['risk_assessment']
+
+def deployed_model():
+    """
+    Function to get the model deployed for the application handling the request, from the process-wide cache
+    """
+    model_path = os.path.join(serving_state()['config']['prod_deployment_path'], 'trainedmodel.pkl')
+    model, _ = load_deployed_model_version(model_path)
+    return model
+
+def stream_predictions(model, first_predictions, chunks, stream):
+    """
+    Function to score the remaining chunks of a CSV stream, yielding the JSON response in pieces
+    
+    The first chunk is scored before the response starts, so a bad header or
+    missing feature is still answered with an error status. Only one chunk of
+    rows and its predictions are in memory at a time. An error in a later
+    chunk, after the response has started, is reported in an "error" field at
+    the end.
+    """
+    yield '{"predictions": ['
+    first = True
+    try:
+        for predictions in itertools.chain([first_predictions], (predict_with(model, chunk) for chunk in chunks)):
+            if len(predictions):
+                yield ('' if first else ',') + json.dumps(predictions.tolist())[1:-1]
+                first = False
+        yield ']}'
+    except Exception as e:
+        logger.error(f"Error in streamed prediction: {str(e)}")
+        yield '], "error": ' + json.dumps(str(e)) + '}'
+    finally:
+        stream.close()
+
+def start_streamed_predictions(stream, chunk_rows):
+    """
+    Function to check the first chunk of a CSV upload and start streaming its predictions
+    
+    Errors in the first chunk are raised here, before any response is sent.
+    """
+    try:
+        model = deployed_model()
+        chunks = pd.read_csv(stream, chunksize=chunk_rows)
+        first_chunk = next(chunks, None)
+        first_predictions = predict_with(model, first_chunk) if first_chunk is not None else []
+    except BaseException:
+        stream.close()
+        raise
+    return Response(stream_with_context(stream_predictions(model, first_predictions, chunks, stream)),
+                    mimetype='application/json')
+
+@api.route("/prediction", methods=['POST', 'OPTIONS'])
 def predict():
     """
     Prediction endpoint
+    
+    Accepts a server-side file ({"filepath": ...}), inline records
+    ({"records": [{...}, ...]}), or a CSV upload sent as a text/csv body or a
+    multipart "file" field. Uploads are scored in chunks and the response is
+    streamed back.
     """
     if request.method == 'OPTIONS':
         return '', 200
     
     try:
+        deployed_model()
+    except FileNotFoundError as e:
+        logger.error(f"No deployed model to predict with: {str(e)}")
+        return jsonify({'error': 'No deployed model'}), 503
+    
+    try:
+        # Streamed CSV upload
+        if request.mimetype == 'text/csv' or 'file' in request.files:
+            if request.mimetype == 'text/csv':
+                stream = request.stream
+            else:
+                # Uploaded files are closed with the request, before the response is streamed,
+                # so the upload is copied to a temporary file owned by the response
+                stream = tempfile.TemporaryFile()
+                shutil.copyfileobj(request.files['file'].stream, stream)
+                stream.seek(0)
+            return start_streamed_predictions(stream, serving_state()['prediction_chunk_rows'])
+        
+        data = request.get_json(silent=True)
+        
+        # Inline records
+        if data and 'records' in data:
+            if not isinstance(data['records'], list) or not data['records']:
+                return jsonify({'error': 'records must be a non-empty list'}), 400
+            df = pd.DataFrame.from_records(data['records'])
+            return jsonify({'predictions': predict_with(deployed_model(), df).tolist()}), 200
+        
         # Get file path from request
-        data = request.get_json()
         if not data or 'filepath' not in data:
-            return jsonify({'error': 'No filepath provided'}), 400
+            return jsonify({'error': 'No filepath, records or CSV upload provided'}), 400
         
         filepath = data['filepath']
         
@@ -32,19 +193,19 @@ def predict():
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        # Read data
-        df = pd.read_csv(filepath)
-        
-        # Get predictions
-        predictions = model_predictions(df)
+        # Get predictions, reused while the file and the deployed model are unchanged
+        predictions, _ = predict_file(filepath, serving_state()['config'])
         
         return jsonify({'predictions': predictions}), 200
         
+    except (KeyError, ValueError) as e:
+        logger.error(f"Invalid prediction input: {str(e)}")
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error in prediction endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route("/scoring", methods=['GET', 'OPTIONS'])
+@api.route("/scoring", methods=['GET', 'OPTIONS'])
 def score():
     """
     Scoring endpoint
@@ -53,16 +214,14 @@ def score():
         return '', 200
     
     try:
-        # Run scoring script
-        f1_score = scoring.score_model()
-        
-        return jsonify({'f1_score': f1_score}), 200
+        # Score the deployed model, memoized on the model and test data hashes
+        return jsonify(scoring.score_deployed_model(serving_state()['config'])), 200
         
     except Exception as e:
         logger.error(f"Error in scoring endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route("/summarystats", methods=['GET', 'OPTIONS'])
+@api.route("/summarystats", methods=['GET', 'OPTIONS'])
 def summary_stats():
     """
     Summary statistics endpoint
@@ -72,7 +231,7 @@ def summary_stats():
     
     try:
         # Get summary statistics
-        summary = dataframe_summary()
+        summary = dataframe_summary(serving_state()['config'])
         
         return jsonify({'summary_statistics': summary}), 200
         
@@ -80,7 +239,7 @@ def summary_stats():
         logger.error(f"Error in summary stats endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route("/diagnostics", methods=['GET', 'OPTIONS'])
+@api.route("/diagnostics", methods=['GET', 'OPTIONS'])
 def diagnostics():
     """
     Diagnostics endpoint
@@ -89,16 +248,22 @@ def diagnostics():
         return '', 200
     
     try:
-        # Get diagnostics
-        missing = missing_data()
-        timing = execution_time()
-        packages = outdated_packages_list()
+        # Get diagnostics, computed concurrently on first use and from snapshots afterwards
+        snapshots = serving_state()['diagnostics_cache'].get()
         
         diagnostics_data = {
-            'missing_data_percentages': missing,
-            'execution_times': timing,
-            'package_versions': packages
+            'missing_data_percentages': snapshots['missing_data']['value'],
+            'execution_times': snapshots['execution_time']['value'],
+            'stage_timings': timing_trends(config=serving_state()['config']),
+            'package_versions': snapshots['outdated_packages']['value'],
+            'model_cache': model_cache_stats(),
+            'prediction_cache': prediction_cache_stats(),
+            'deployed_release': current_release(serving_state()['config']['prod_deployment_path']),
+            'snapshot_age_seconds': {name: snapshot['age_seconds'] for name, snapshot in snapshots.items()}
         }
+        errors = {name: snapshot['error'] for name, snapshot in snapshots.items() if snapshot['error']}
+        if errors:
+            diagnostics_data['snapshot_errors'] = errors
         
         return jsonify(diagnostics_data), 200
         
@@ -106,6 +271,10 @@ def diagnostics():
         logger.error(f"Error in diagnostics endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Module-level application for `python app.py`, `flask run` and existing imports
+app = create_app()
+
 if __name__ == '__main__':
+    # Development server; see wsgi.py and gunicorn.conf.py for multi-worker serving
     app.run(host='0.0.0.0', port=8000, debug=True)
 
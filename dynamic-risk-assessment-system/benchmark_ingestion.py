@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import time
+import tempfile
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from ingestion import merge_multiple_dataframe, read_source_files
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def write_source_files(folder, files, rows):
+    """
+    Function to write synthetic source files in the sourcedata layout
+    """
+    rng = np.random.default_rng(42)
+    for i in range(files):
+        pd.DataFrame({
+            'corporation': [f'c{i}x{j}' for j in range(rows)],
+            'lastmonth_activity': rng.integers(0, 5000, rows),
+            'lastyear_activity': rng.integers(0, 50000, rows),
+            'number_of_employees': rng.integers(1, 2000, rows),
+            'exited': rng.integers(0, 2, rows)
+        }).to_csv(os.path.join(folder, f'activity_{i:04d}.csv'), index=False)
+
+def peak_memory_mb():
+    """
+    Function to get the peak resident memory of this process in MB
+    """
+    # VmHWM starts afresh in a spawned process, while ru_maxrss keeps the parent's peak from the fork
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1e3
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def run_ingestion(config):
+    """
+    Function to run one full ingestion and return its time and the peak memory of the process
+    """
+    logging.getLogger('ingestion').setLevel(logging.WARNING)
+    start_time = time.time()
+    merge_multiple_dataframe(full_refresh=True, config=config)
+    ingest_time = time.time() - start_time
+    return ingest_time, peak_memory_mb()
+
+def benchmark_ingestion(files=64, rows=50000, workers=4):
+    """
+    Function to compare sequential, threaded, multi-process and streaming ingestion of many source files
+    
+    Each ingestion runs in a fresh process so its peak resident memory can be measured;
+    for the process pool this leaves out the pool's workers.
+    """
+    with open('config.json', 'r') as f:
+        base_config = json.load(f)
+    
+    modes = [
+        ('sequential', 1, 'thread', 0),
+        ('thread', workers, 'thread', 0),
+        ('process', workers, 'process', 0),
+        ('streaming', 1, 'thread', 100000)
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        input_folder_path = os.path.join(folder, 'sourcedata')
+        os.makedirs(input_folder_path)
+        write_source_files(input_folder_path, files, rows)
+        logger.info(f"Benchmarking ingestion of {files} files with {rows} rows each")
+        
+        file_paths = [os.path.join(input_folder_path, f) for f in sorted(os.listdir(input_folder_path))]
+        for name, mode_workers, executor, chunk_rows in modes:
+            # Reading alone, then a full ingestion run
+            read_time = np.nan
+            if not chunk_rows:
+                start_time = time.time()
+                read_source_files(file_paths, [None] * len(file_paths), mode_workers, executor)
+                read_time = time.time() - start_time
+            
+            config = dict(base_config,
+                          input_folder_path=input_folder_path,
+                          output_folder_path=os.path.join(folder, f'ingested_{name}'),
+                          ingestion_workers=mode_workers,
+                          ingestion_executor=executor,
+                          ingestion_chunk_rows=chunk_rows,
+                          timing_history_path=os.path.join(folder, 'timing_history.jsonl'))
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                ingest_time, peak_mb = pool.submit(run_ingestion, config).result()
+            
+            results.append({
+                'mode': name,
+                'workers': mode_workers,
+                'read_s': read_time,
+                'ingest_s': ingest_time,
+                'peak_mb': peak_mb
+            })
+    
+    results = pd.DataFrame(results).set_index('mode')
+    results['read_speedup'] = results.loc['sequential', 'read_s'] / results['read_s']
+    results['ingest_speedup'] = results.loc['sequential', 'ingest_s'] / results['ingest_s']
+    print(results.round(3).to_string())
+    
+    return results
+
+if __name__ == '__main__':
+    logging.getLogger('ingestion').setLevel(logging.WARNING)
+    benchmark_ingestion(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,110 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+import requests
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'http://127.0.0.1:8000'
+
+def start_server(command):
+    """
+    Function to start an API server in its own process group and wait until it answers
+    """
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f'{BASE_URL}/summarystats', timeout=5)
+            return server
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+
+def stop_server(server):
+    """
+    Function to stop a server with all of its worker and reloader processes
+    """
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+def run_load(method, path, body, clients, requests_per_client):
+    """
+    Function to send requests from concurrent clients and return the latencies of the successful ones
+    """
+    def client():
+        latencies = []
+        with requests.Session() as session:
+            for _ in range(requests_per_client):
+                start_time = time.perf_counter()
+                response = session.request(method, f'{BASE_URL}{path}', json=body)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start_time)
+        return latencies
+    
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [latency for result in pool.map(lambda _: client(), range(clients)) for latency in result]
+    return latencies, time.perf_counter() - start_time
+
+def benchmark_serving(clients=8, requests_per_client=50, workers=3):
+    """
+    Function to compare the development server with gunicorn workers on /prediction and /summarystats
+    """
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    test_file = os.path.join(config['test_data_path'], 'testdata.csv')
+    records = pd.read_csv(test_file).to_dict('records')
+    
+    servers = [
+        ('dev server', [sys.executable, 'app.py']),
+        (f'gunicorn {workers} workers', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                         '--bind', '127.0.0.1:8000', '--workers', str(workers), 'wsgi:app'])
+    ]
+    endpoints = [
+        ('/prediction filepath', 'POST', '/prediction', {'filepath': test_file}),
+        ('/prediction records', 'POST', '/prediction', {'records': records}),
+        ('/summarystats', 'GET', '/summarystats', None)
+    ]
+    
+    results = []
+    for server_name, command in servers:
+        server = start_server(command)
+        try:
+            for endpoint_name, method, path, body in endpoints:
+                # Warm up each worker's caches first
+                run_load(method, path, body, clients, 5)
+                latencies, elapsed = run_load(method, path, body, clients, requests_per_client)
+                results.append({
+                    'server': server_name,
+                    'endpoint': endpoint_name,
+                    'ok': len(latencies),
+                    'req_per_s': len(latencies) / elapsed,
+                    'p50_ms': np.percentile(latencies, 50) * 1000 if latencies else np.nan,
+                    'p95_ms': np.percentile(latencies, 95) * 1000 if latencies else np.nan
+                })
+        finally:
+            stop_server(server)
+    
+    results = pd.DataFrame(results).set_index(['endpoint', 'server']).sort_index()
+    print(f"{clients} clients x {requests_per_client} requests on {os.cpu_count()} CPUs")
+    print(results.round(1).to_string())
+    
+    return results
+
+if __name__ == '__main__':
+    benchmark_serving(*[int(arg) for arg in sys.argv[1:4]])
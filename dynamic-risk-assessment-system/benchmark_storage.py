@@ -0,0 +1,77 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import tempfile
+import logging
+from datastore import apply_schema, load_final_data
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def scaled_dataset(rows):
+    """
+    Function to build a synthetic dataset by resampling the final dataset to the given size
+    """
+    df = load_final_data()
+    rng = np.random.default_rng(42)
+    scaled = df.sample(n=rows, replace=True, random_state=42).reset_index(drop=True)
+    
+    # Perturb values so the copies do not compress unrealistically well
+    for col in ['lastmonth_activity', 'lastyear_activity', 'number_of_employees']:
+        scaled[col] = (scaled[col] * rng.uniform(0.5, 1.5, rows)).round().astype('int64')
+    scaled['corporation'] = scaled['corporation'].str.cat(pd.Series(rng.integers(0, 10**6, rows)).astype(str))
+    
+    return apply_schema(scaled)
+
+def time_format(df, folder, name, write, read):
+    """
+    Function to time writing and reading a dataset in one format
+    """
+    path = os.path.join(folder, name)
+    
+    start_time = time.time()
+    write(df, path)
+    write_time = time.time() - start_time
+    
+    start_time = time.time()
+    read(path)
+    read_time = time.time() - start_time
+    
+    return {
+        'format': name.split('.')[-1],
+        'write_s': write_time,
+        'read_s': read_time,
+        'size_mb': os.path.getsize(path) / 1e6
+    }
+
+def benchmark_storage(rows=1000000):
+    """
+    Function to compare CSV, Parquet and Feather on a synthetically scaled dataset
+    """
+    df = scaled_dataset(rows)
+    logger.info(f"Benchmarking storage formats with {len(df)} rows")
+    
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        results.append(time_format(df, folder, 'data.csv',
+                                   lambda d, p: d.to_csv(p, index=False),
+                                   lambda p: apply_schema(pd.read_csv(p))))
+        results.append(time_format(df, folder, 'data.parquet',
+                                   lambda d, p: d.to_parquet(p, index=False),
+                                   pd.read_parquet))
+        results.append(time_format(df, folder, 'data.feather',
+                                   lambda d, p: d.to_feather(p),
+                                   pd.read_feather))
+    
+    results = pd.DataFrame(results).set_index('format')
+    results['read_speedup'] = results.loc['csv', 'read_s'] / results['read_s']
+    results['size_ratio'] = results['size_mb'] / results.loc['csv', 'size_mb']
+    print(results.round(3).to_string())
+    
+    return results
+
+if __name__ == '__main__':
+    benchmark_storage(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
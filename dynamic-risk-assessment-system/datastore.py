@@ -0,0 +1,416 @@
+import pandas as pd
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Typed schema shared by every reader
+COLUMN_TYPES = {
+    'corporation': 'string',
+    'lastmonth_activity': 'int64',
+    'lastyear_activity': 'int64',
+    'number_of_employees': 'int64',
+    'exited': 'int64'
+}
+
+# A parquet dataset is a directory of parts; appends add a part, many parts are compacted
+MAX_PARTS = 32
+
+# Written next to the parts: the state of the CSV the parquet copy holds the same rows as
+SOURCE_FILE = '_source.json'
+
+# Datasets shared by all readers in the process, re-read when their files change
+_dataset_cache = {}
+_dataset_cache_lock = threading.Lock()
+
+def columnar_available():
+    """
+    Function to check whether the parquet engine (pyarrow) is installed
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def storage_settings(config=None):
+    """
+    Function to get the configured data format and whether CSV copies are exported
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    data_format = config.get('data_format', 'csv')
+    if data_format == 'parquet' and not columnar_available():
+        logger.warning("pyarrow is not installed, falling back to CSV storage")
+        data_format = 'csv'
+    
+    return data_format, config.get('export_csv', True)
+
+def apply_schema(df):
+    """
+    Function to cast known columns to their typed schema
+    """
+    df = df.copy()
+    for col, dtype in COLUMN_TYPES.items():
+        if col not in df.columns:
+            continue
+        # Integer columns with missing values stay float so NaN survives
+        if dtype == 'int64' and df[col].isna().any():
+            df[col] = df[col].astype('float64')
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def dataset_paths(folder, name):
+    """
+    Function to get the parquet and CSV paths of a dataset
+    """
+    return os.path.join(folder, f'{name}.parquet'), os.path.join(folder, f'{name}.csv')
+
+def list_parts(parquet_path):
+    """
+    Function to list the part files of a parquet dataset
+    """
+    if not os.path.isdir(parquet_path):
+        return []
+    return sorted(f for f in os.listdir(parquet_path) if f.endswith('.parquet'))
+
+def csv_state(csv_path):
+    """
+    Function to get the size, modification time, inode and content hash of a CSV, or None without one
+    """
+    if not os.path.exists(csv_path):
+        return None
+    stat = os.stat(csv_path)
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino, 'sha256': digest.hexdigest()}
+
+def record_source(parquet_path, csv_path):
+    """
+    Function to record that a parquet copy holds the same rows as the CSV at csv_path
+    """
+    source_path = os.path.join(parquet_path, SOURCE_FILE)
+    # A temporary file unique to this call, so concurrent writers never clobber each other's record
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{SOURCE_FILE}-', dir=parquet_path)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(csv_state(csv_path), f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, source_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def parquet_fresh(parquet_path, csv_path):
+    """
+    Function to check whether a parquet copy holds the same rows as its CSV
+    
+    The CSV is compared with the state recorded when the copy was written:
+    by size, modification time and inode first, and by content hash when
+    those differ, so a CSV replaced by different content with an older mtime
+    (mv, cp -p, rsync -t) is not mistaken for the copy.
+    """
+    if not list_parts(parquet_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    try:
+        with open(os.path.join(parquet_path, SOURCE_FILE), 'r') as f:
+            source = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    if source is None:
+        return False
+    
+    stat = os.stat(csv_path)
+    if (stat.st_size, stat.st_mtime_ns, stat.st_ino) == (source['size'], source['mtime_ns'], source['inode']):
+        return True
+    return stat.st_size == source['size'] and csv_state(csv_path)['sha256'] == source['sha256']
+
+def read_dataset(folder, name, config=None):
+    """
+    Function to read a dataset, preferring its typed columnar copy
+    
+    The parquet copy is used when it holds the same rows as the CSV (see
+    parquet_fresh), otherwise the CSV is read. Reading never writes: parquet
+    copies are only made on the write path (write_dataset, append_dataset,
+    convert_dataset), so concurrent readers cannot collide.
+    """
+    parquet_path, csv_path = dataset_paths(folder, name)
+    
+    if columnar_available() and parquet_fresh(parquet_path, csv_path):
+        try:
+            return pd.read_parquet(parquet_path)
+        except OSError as e:
+            # Swapped out by a writer during the read; the CSV holds the same rows
+            if not os.path.exists(csv_path):
+                raise
+            logger.warning(f"Reading {csv_path} instead of its parquet copy: {str(e)}")
+    
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Dataset {name} not found in {folder}")
+    return apply_schema(pd.read_csv(csv_path))
+
+def convert_dataset(folder, name, config=None):
+    """
+    Function to write a parquet copy of a CSV dataset unless an up-to-date one exists
+    
+    Returns True when a copy was written.
+    """
+    data_format, _ = storage_settings(config)
+    parquet_path, csv_path = dataset_paths(folder, name)
+    if data_format != 'parquet' or not os.path.exists(csv_path) or parquet_fresh(parquet_path, csv_path):
+        return False
+    
+    logger.info(f"Converting {csv_path} to parquet")
+    write_parquet(apply_schema(pd.read_csv(csv_path)), parquet_path, csv_path)
+    return True
+
+def swap_directory(new_path, path):
+    """
+    Function to move a complete directory into place, replacing any previous one
+    """
+    old_path = None
+    if os.path.exists(path):
+        old_path = new_path + '.old'
+        os.rename(path, old_path)
+    os.rename(new_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+def write_parquet(df, parquet_path, csv_path=None):
+    """
+    Function to replace a parquet dataset with a single part
+    
+    The part is written to a temporary directory unique to this call, so
+    concurrent writers never share files, and records csv_path as the CSV it
+    matches.
+    """
+    tmp_path = tempfile.mkdtemp(prefix=f'.{os.path.basename(parquet_path)}-', dir=os.path.dirname(parquet_path) or '.')
+    # mkdtemp is private to its owner; other users such as the web server must read the dataset
+    os.chmod(tmp_path, 0o755)
+    try:
+        df.to_parquet(os.path.join(tmp_path, 'part-00000.parquet'), index=False)
+        if csv_path:
+            record_source(tmp_path, csv_path)
+        swap_directory(tmp_path, parquet_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+def write_dataset(df, folder, name, config=None):
+    """
+    Function to write a dataset in the configured format, replacing any previous copy
+    """
+    data_format, export_csv = storage_settings(config)
+    parquet_path, csv_path = dataset_paths(folder, name)
+    os.makedirs(folder, exist_ok=True)
+    df = apply_schema(df)
+    
+    # CSV first so the parquet copy can record it
+    if data_format == 'csv' or export_csv:
+        df.to_csv(csv_path, index=False)
+    if data_format == 'parquet':
+        write_parquet(df, parquet_path, csv_path)
+
+def append_dataset(df, folder, name, config=None):
+    """
+    Function to append rows to a dataset in the configured format
+    """
+    data_format, export_csv = storage_settings(config)
+    parquet_path, csv_path = dataset_paths(folder, name)
+    df = apply_schema(df)
+    
+    if data_format == 'csv' or export_csv:
+        df.to_csv(csv_path, mode='a', header=not os.path.exists(csv_path), index=False)
+    if data_format == 'parquet':
+        parts = list_parts(parquet_path)
+        if len(parts) >= MAX_PARTS:
+            # Compact so reads do not slow down as appends accumulate
+            write_parquet(pd.concat([pd.read_parquet(parquet_path), df], ignore_index=True), parquet_path, csv_path)
+        else:
+            os.makedirs(parquet_path, exist_ok=True)
+            df.to_parquet(os.path.join(parquet_path, f'part-{len(parts):05d}.parquet'), index=False)
+            record_source(parquet_path, csv_path)
+
+class DatasetWriter:
+    """
+    Class to write a dataset chunk by chunk without holding it in memory
+    
+    Appending adds the chunks to the CSV export and to one new parquet part.
+    Otherwise the dataset is written to temporary files that replace the old
+    copy on close.
+    """
+    def __init__(self, folder, name, append=False, config=None):
+        self.data_format, self.export_csv = storage_settings(config)
+        self.parquet_path, self.csv_path = dataset_paths(folder, name)
+        self.append = append
+        self.rows = 0
+        self._csv_file = None
+        self._parquet_writer = None
+        self._tmp_path = None
+        os.makedirs(folder, exist_ok=True)
+    
+    def write(self, df):
+        """
+        Function to write one chunk of rows
+        """
+        df = apply_schema(df)
+        if self.data_format == 'csv' or self.export_csv:
+            header = self._csv_file is None and not (self.append and os.path.exists(self.csv_path))
+            if self._csv_file is None:
+                csv_path = self.csv_path if self.append else self.csv_path + '.tmp'
+                self._csv_file = open(csv_path, 'a' if self.append else 'w', newline='')
+            df.to_csv(self._csv_file, header=header, index=False)
+        
+        if self.data_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self._part_path(), table.schema)
+            else:
+                # A chunk with missing values has float columns where others have int
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        
+        self.rows += len(df)
+    
+    def close(self):
+        """
+        Function to finish writing and, unless appending, swap the new dataset in
+        """
+        if self._csv_file is not None:
+            self._csv_file.close()
+            if not self.append:
+                os.replace(self.csv_path + '.tmp', self.csv_path)
+        
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            if self.append:
+                record_source(self.parquet_path, self.csv_path)
+            else:
+                record_source(self._tmp_path, self.csv_path)
+                swap_directory(self._tmp_path, self.parquet_path)
+    
+    def _part_path(self):
+        if self.append:
+            os.makedirs(self.parquet_path, exist_ok=True)
+            return os.path.join(self.parquet_path, f'part-{len(list_parts(self.parquet_path)):05d}.parquet')
+        
+        self._tmp_path = tempfile.mkdtemp(prefix=f'.{os.path.basename(self.parquet_path)}-',
+                                          dir=os.path.dirname(self.parquet_path) or '.')
+        os.chmod(self._tmp_path, 0o755)
+        return os.path.join(self._tmp_path, 'part-00000.parquet')
+
+def dataset_state(folder, name, config=None):
+    """
+    Function to record the on-disk state of a dataset, used to roll back interrupted appends
+    """
+    data_format, export_csv = storage_settings(config)
+    parquet_path, csv_path = dataset_paths(folder, name)
+    state = {'format': data_format}
+    if data_format == 'parquet':
+        state['parts'] = list_parts(parquet_path)
+    if (data_format == 'csv' or export_csv) and os.path.exists(csv_path):
+        state['csv_bytes'] = os.path.getsize(csv_path)
+    return state
+
+def restore_dataset_state(folder, name, state, config=None):
+    """
+    Function to roll a dataset back to a recorded state
+    
+    Returns False when the dataset cannot be restored and must be rebuilt.
+    """
+    data_format, export_csv = storage_settings(config)
+    if state.get('format') != data_format:
+        return False
+    
+    parquet_path, csv_path = dataset_paths(folder, name)
+    if data_format == 'csv' or export_csv:
+        if 'csv_bytes' not in state or not os.path.exists(csv_path):
+            return False
+        csv_size = os.path.getsize(csv_path)
+        if csv_size < state['csv_bytes']:
+            return False
+        if csv_size > state['csv_bytes']:
+            logger.warning(f"Truncating rows appended to {csv_path} by an interrupted run")
+            with open(csv_path, 'r+b') as f:
+                f.truncate(state['csv_bytes'])
+    
+    # Parts last so the parquet copy records the restored CSV export
+    if data_format == 'parquet':
+        parts = list_parts(parquet_path)
+        if not set(state['parts']) <= set(parts):
+            return False
+        for part in set(parts) - set(state['parts']):
+            logger.warning(f"Removing {part} left by an interrupted append")
+            os.remove(os.path.join(parquet_path, part))
+        if os.path.isdir(parquet_path):
+            record_source(parquet_path, csv_path)
+    return True
+
+def dataset_signature(folder, name):
+    """
+    Function to get the size and modification time of every file backing a dataset
+    """
+    parquet_path, csv_path = dataset_paths(folder, name)
+    paths = [os.path.join(parquet_path, part) for part in list_parts(parquet_path)] + [csv_path]
+    signature = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+def cached_dataset(folder, name, config=None):
+    """
+    Function to get a dataset shared by all callers in the process, with its signature
+    
+    The dataset is only read again when its files change. The returned
+    DataFrame is shared, so callers must not modify it.
+    """
+    key = (os.path.abspath(folder), name)
+    signature = dataset_signature(folder, name)
+    with _dataset_cache_lock:
+        cached = _dataset_cache.get(key)
+        if cached and cached['signature'] == signature:
+            return cached['df'], signature
+    
+    # Keyed on the signature taken before reading, so a change during the read is picked up next time
+    df = read_dataset(folder, name, config)
+    with _dataset_cache_lock:
+        _dataset_cache[key] = {'df': df, 'signature': signature}
+    logger.info(f"Cached dataset {name} from {folder} with shape {df.shape}")
+    return df, signature
+
+def load_final_data(config=None):
+    """
+    Function to load the ingested final dataset
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    return read_dataset(config['output_folder_path'], 'finaldata', config)
+
+def load_test_data(config=None):
+    """
+    Function to load the test dataset
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    return read_dataset(config['test_data_path'], 'testdata', config)
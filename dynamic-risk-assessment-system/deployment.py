@@ -1,19 +1,30 @@
-import shutil
 import os
+import sys
 import json
+import tempfile
 import logging
+from stage_timing import timed_stage
+from drift import save_reference_data, REFERENCE_FILE, REFERENCE_META_FILE
+from release_store import publish_release, rollback_release
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def store_model_into_pickle():
+@timed_stage('deployment')
+def store_model_into_pickle(config=None):
     """
     Function for deployment
+    
+    Publishes the trained model, its score, the ingested files record and a
+    sample of the training data (for drift checks) as a content-addressed release, see
+    release_store.py. Unchanged files are not copied again, and redeploying
+    identical files leaves the current release in place.
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
     output_model_path = config['output_model_path']
     output_folder_path = config['output_folder_path']
@@ -22,26 +33,55 @@ def store_model_into_pickle():
     # Create production deployment directory
     os.makedirs(prod_deployment_path, exist_ok=True)
     
-    # Files to copy
-    files_to_copy = [
+    # Files to release
+    files_to_release = [
         ('trainedmodel.pkl', output_model_path),
         ('latestscore.txt', output_model_path),
         ('ingestedfiles.txt', output_folder_path)
     ]
     
-    # Copy files to production deployment
-    for filename, source_dir in files_to_copy:
+    artifacts = {}
+    for filename, source_dir in files_to_release:
         source_path = os.path.join(source_dir, filename)
-        dest_path = os.path.join(prod_deployment_path, filename)
-        
         if os.path.exists(source_path):
-            shutil.copy2(source_path, dest_path)
-            logger.info(f"Copied {filename} to production deployment")
+            artifacts[filename] = source_path
         else:
             logger.warning(f"File {filename} not found in {source_dir}")
     
-    logger.info("Model deployment completed")
+    if 'trainedmodel.pkl' not in artifacts:
+        logger.error("No trained model to deploy")
+        return
+    
+    with tempfile.TemporaryDirectory(dir=prod_deployment_path) as staging_path:
+        # Keep a sample of the data the model was trained on for drift checks of later ingestions
+        artifacts[REFERENCE_FILE] = os.path.join(staging_path, REFERENCE_FILE)
+        artifacts[REFERENCE_META_FILE] = os.path.join(staging_path, REFERENCE_META_FILE)
+        save_reference_data(artifacts[REFERENCE_FILE], artifacts[REFERENCE_META_FILE], config)
+        
+        release_id = publish_release(prod_deployment_path, artifacts, config.get('deployment_keep_releases', 10))
+    
+    logger.info(f"Model deployment completed, release {release_id}")
+    return release_id
+
+def rollback(release_id=None, config=None):
+    """
+    Function to make an earlier release current again, by default the previous one
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    try:
+        return rollback_release(config['prod_deployment_path'], release_id)
+    except ValueError as e:
+        logger.error(f"Rollback failed: {str(e)}")
+        return None
 
 if __name__ == '__main__':
-    store_model_into_pickle()
+    if '--rollback' in sys.argv:
+        # Optionally followed by the release id to roll back to
+        arguments = sys.argv[sys.argv.index('--rollback') + 1:]
+        rollback(arguments[0] if arguments else None)
+    else:
+        store_model_into_pickle()
 
@@ -6,19 +6,120 @@ import os
 import time
 import subprocess
 import sys
+import io
+import hashlib
+import tempfile
+import threading
+import importlib.metadata
+from itertools import takewhile
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from stage_timing import timing_trends
+from datastore import cached_dataset
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def model_predictions(dataframe):
+# Deployed models kept in memory per path, reloaded when the file changes
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+_model_cache_stats = {'loads': 0, 'hits': 0, 'load_seconds_total': 0.0, 'last_load_seconds': None}
+
+# Predictions per (input file hash, model hash), least recently used first,
+# and input file hashes per path, rehashed when the file changes
+_prediction_cache = OrderedDict()
+_file_hashes = {}
+_prediction_cache_lock = threading.Lock()
+_prediction_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'rows': 0}
+
+# Statistics of the final dataset per resolved folder, recomputed when the dataset changes
+_statistics_cache = {}
+_statistics_cache_lock = threading.Lock()
+
+def load_deployed_model(model_path):
+    """
+    Function to load a model, reusing the cached copy while the file is unchanged
+    """
+    return load_deployed_model_version(model_path)[0]
+
+def load_deployed_model_version(model_path):
+    """
+    Function to load a model from the cache together with the content hash of its file
+    
+    A file whose size, mtime or inode changed is re-read and hashed, and only
+    un-pickled again if its content hash differs from the cached model.
+    """
+    with open(model_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        with _model_cache_lock:
+            cached = _model_cache.get(model_path)
+            if cached and cached['signature'] == signature:
+                _model_cache_stats['hits'] += 1
+                return cached['model'], cached['sha256']
+        
+        start_time = time.time()
+        content = f.read()
+    
+    sha256 = hashlib.sha256(content).hexdigest()
+    with _model_cache_lock:
+        cached = _model_cache.get(model_path)
+        if cached and cached['sha256'] == sha256:
+            # Touched or re-copied but unchanged
+            cached['signature'] = signature
+            _model_cache_stats['hits'] += 1
+            return cached['model'], sha256
+    
+    model = pickle.loads(content)
+    load_time = time.time() - start_time
+    
+    with _model_cache_lock:
+        _model_cache[model_path] = {
+            'model': model,
+            'signature': signature,
+            'sha256': sha256,
+            'loaded_at': time.time()
+        }
+        _model_cache_stats['loads'] += 1
+        _model_cache_stats['load_seconds_total'] += load_time
+        _model_cache_stats['last_load_seconds'] = load_time
+    
+    logger.info(f"Loaded model {model_path} ({sha256[:12]}) in {load_time * 1000:.1f} ms")
+    return model, sha256
+
+def model_cache_stats():
+    """
+    Function to get load counts and timings of the model cache
+    """
+    with _model_cache_lock:
+        stats = dict(_model_cache_stats)
+        stats['models'] = {
+            path: {'sha256': cached['sha256'], 'loaded_at': cached['loaded_at']}
+            for path, cached in _model_cache.items()
+        }
+    return stats
+
+def predict_with(model, dataframe):
+    """
+    Function to get the predictions of a model for a dataframe as an array
+    """
+    # Prepare features (exclude 'corporation' and 'exited' columns)
+    feature_columns = [col for col in dataframe.columns if col not in ['corporation', 'exited']]
+    X = dataframe[feature_columns]
+    
+    return model.predict(X)
+
+def model_predictions(dataframe, config=None):
     """
     Function to get model predictions
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
     prod_deployment_path = config['prod_deployment_path']
     
@@ -28,171 +129,363 @@ def model_predictions(dataframe):
         logger.error(f"Deployed model not found at {model_path}")
         return []
     
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    
-    # Prepare features (exclude 'corporation' and 'exited' columns)
-    feature_columns = [col for col in dataframe.columns if col not in ['corporation', 'exited']]
-    X = dataframe[feature_columns]
+    model = load_deployed_model(model_path)
     
     # Make predictions
-    predictions = model.predict(X)
+    predictions = predict_with(model, dataframe)
     
     return predictions.tolist()
 
-def dataframe_summary():
+def known_sha256(file_path):
     """
-    Function to get summary statistics
+    Function to get the remembered content hash of a file if its size, mtime and inode are unchanged, or None
     """
-    # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    stat = os.stat(file_path)
+    with _prediction_cache_lock:
+        cached = _file_hashes.get(os.path.abspath(file_path))
+        if cached and cached['signature'] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return cached['sha256']
+    return None
+
+def file_sha256(file_path):
+    """
+    Function to get the content hash of a file, computed again only when its size, mtime or inode change
+    """
+    sha256 = known_sha256(file_path)
+    if sha256 is not None:
+        return sha256
     
-    output_folder_path = config['output_folder_path']
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    key = os.path.abspath(file_path)
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
     
-    # Read finaldata.csv
-    final_data_path = os.path.join(output_folder_path, 'finaldata.csv')
-    if not os.path.exists(final_data_path):
-        logger.error(f"Final data file not found at {final_data_path}")
-        return []
+    with _prediction_cache_lock:
+        _file_hashes[key] = {'signature': signature, 'sha256': sha256}
+    return sha256
+
+def cached_predictions(key):
+    """
+    Function to get the cached predictions for a (file hash, model hash) key, counting a hit, or None
+    """
+    with _prediction_cache_lock:
+        predictions = _prediction_cache.get(key)
+        if predictions is not None:
+            _prediction_cache.move_to_end(key)
+            _prediction_cache_stats['hits'] += 1
+        return predictions
+
+def read_file_version(file_path):
+    """
+    Function to read a file's bytes with their content hash, so what is parsed is exactly what was hashed
+    """
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    
+    # Remembered for the file that was read; a file replaced since has another inode and is hashed again
+    with _prediction_cache_lock:
+        _file_hashes[os.path.abspath(file_path)] = {'signature': (stat.st_size, stat.st_mtime_ns, stat.st_ino),
+                                                    'sha256': sha256}
+    return data, sha256
+
+def predict_file(file_path, config=None):
+    """
+    Function to get model predictions for a CSV file, cached on the content hashes of the file and the deployed model
+    
+    Returns the predictions and whether they came from the cache. Once the
+    cached predictions hold more than prediction_cache_rows rows, the least
+    recently used are dropped; a file larger than that is never cached.
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    model_path = os.path.join(config['prod_deployment_path'], 'trainedmodel.pkl')
+    if not os.path.exists(model_path):
+        logger.error(f"Deployed model not found at {model_path}")
+        return [], False
     
-    df = pd.read_csv(final_data_path)
+    model, model_hash = load_deployed_model_version(model_path)
+    known = known_sha256(file_path)
+    predictions = cached_predictions((known, model_hash)) if known is not None else None
+    if predictions is not None:
+        return predictions.tolist(), True
     
-    # Calculate summary statistics for numeric columns
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
-    summary_stats = []
+    # Hash the bytes that are parsed, so a file replaced meanwhile is never cached under the old hash
+    data, sha256 = read_file_version(file_path)
+    key = (sha256, model_hash)
+    predictions = cached_predictions(key) if sha256 != known else None
+    if predictions is not None:
+        return predictions.tolist(), True
+    with _prediction_cache_lock:
+        _prediction_cache_stats['misses'] += 1
     
-    for col in numeric_columns:
-        if col != 'exited':  # Exclude target variable
-            stats = {
-                'column': col,
-                'mean': df[col].mean(),
-                'median': df[col].median(),
-                'std': df[col].std()
-            }
-            summary_stats.append(stats)
+    predictions = predict_with(model, pd.read_csv(io.BytesIO(data)))
     
-    return summary_stats
+    max_rows = config.get('prediction_cache_rows', 1000000)
+    if len(predictions) <= max_rows:
+        with _prediction_cache_lock:
+            if key not in _prediction_cache:
+                _prediction_cache[key] = predictions
+                _prediction_cache_stats['rows'] += len(predictions)
+            while _prediction_cache_stats['rows'] > max_rows:
+                _, evicted = _prediction_cache.popitem(last=False)
+                _prediction_cache_stats['rows'] -= len(evicted)
+                _prediction_cache_stats['evictions'] += 1
+    
+    return predictions.tolist(), False
 
-def missing_data():
+def prediction_cache_stats():
     """
-    Function to check for missing data
+    Function to get the hit rate and size of the prediction cache
     """
-    # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    with _prediction_cache_lock:
+        stats = dict(_prediction_cache_stats)
+        stats['entries'] = len(_prediction_cache)
+    requests = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / requests if requests else None
+    return stats
+
+def dataset_statistics(config=None):
+    """
+    Function to compute the summary and missing-data statistics of the final dataset in one pass
+    
+    Both the dataset and its statistics are cached until the dataset's files change.
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
-    output_folder_path = config['output_folder_path']
+    # Keyed by folder too, as datasets in different folders can have identical file signatures
+    key = os.path.realpath(config['output_folder_path'])
+    df, signature = cached_dataset(config['output_folder_path'], 'finaldata', config)
+    with _statistics_cache_lock:
+        cached = _statistics_cache.get(key)
+        if cached and cached['signature'] == signature:
+            return cached['statistics']
     
-    # Read finaldata.csv
-    final_data_path = os.path.join(output_folder_path, 'finaldata.csv')
-    if not os.path.exists(final_data_path):
-        logger.error(f"Final data file not found at {final_data_path}")
+    # Mean, median and std of all numeric columns at once, excluding the target variable
+    numeric = df.select_dtypes(include=[np.number]).drop(columns=['exited'], errors='ignore')
+    summary = numeric.agg(['mean', 'median', 'std'])
+    missing = df.isna().mean() * 100
+    
+    statistics = {
+        'summary': [
+            {'column': col, 'mean': float(summary.at['mean', col]), 'median': float(summary.at['median', col]),
+             'std': float(summary.at['std', col])}
+            for col in summary.columns
+        ],
+        'missing': [float(pct) for pct in missing]
+    }
+    with _statistics_cache_lock:
+        _statistics_cache[key] = {'signature': signature, 'statistics': statistics}
+    return statistics
+
+def dataframe_summary(config=None):
+    """
+    Function to get summary statistics
+    """
+    try:
+        return dataset_statistics(config)['summary']
+    except FileNotFoundError as e:
+        logger.error(str(e))
         return []
+
+def missing_data(config=None):
+    """
+    Function to check for missing data
+    """
+    try:
+        return dataset_statistics(config)['missing']
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return []
+
+def execution_time(config=None):
+    """
+    Function to get timing statistics
     
-    df = pd.read_csv(final_data_path)
+    Returns the wall times in seconds of the latest recorded ingestion and
+    training runs (None for a stage that has not run yet) rather than re-running them.
+    """
+    trends = timing_trends(config=config)
+    return [trends[stage]['latest']['wall_seconds'] if stage in trends else None for stage in ['ingestion', 'training']]
+
+def parse_version(version):
+    """
+    Function to turn a version string into a comparable key, or None when it is not a valid version
     
-    # Calculate percentage of missing values for each column
-    missing_percentages = []
-    for col in df.columns:
-        missing_pct = (df[col].isna().sum() / len(df)) * 100
-        missing_percentages.append(missing_pct)
+    Keys are Version objects when packaging is installed and tuples of the
+    leading numeric parts otherwise, never a mix of the two, so any two keys
+    compare. packaging is optional; without it a version with no numeric part,
+    such as 'Unknown', is invalid.
+    """
+    try:
+        from packaging.version import Version, InvalidVersion
+    except ImportError:
+        # Without packaging, compare the leading numeric parts
+        parts = []
+        for part in str(version).split('.'):
+            digits = ''.join(takewhile(str.isdigit, part))
+            parts.append(int(digits) if digits else None)
+        if all(part is None for part in parts):
+            return None
+        return tuple(0 if part is None else part for part in parts)
     
-    return missing_percentages
+    try:
+        return Version(str(version))
+    except InvalidVersion:
+        return None
 
-def execution_time():
+def load_package_index_snapshot(snapshot_path):
     """
-    Function to get timing statistics
+    Function to load the latest known version of each package from a local index snapshot
+    
+    The snapshot maps package names to a version or a list of versions, e.g.
+    {"pandas": ["1.5.3", "2.2.3"]}; it is written by update_package_index_snapshot.
+    """
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return {}
+    
+    with open(snapshot_path, 'r') as f:
+        snapshot = json.load(f)
+    snapshot = snapshot.get('packages', snapshot)
+    
+    latest = {}
+    for package, versions in snapshot.items():
+        versions = [versions] if isinstance(versions, str) else versions
+        # Versions that do not parse cannot be ordered, so they are skipped
+        versions = [version for version in versions if parse_version(version) is not None]
+        if versions:
+            latest[package.lower()] = max(versions, key=parse_version)
+    return latest
+
+def check_package(package_name, required_version, latest_versions):
+    """
+    Function to check one pinned requirement against installed metadata and the index snapshot
     """
-    # Time data ingestion
-    start_time = time.time()
-    os.system('python ingestion.py')
-    ingestion_time = time.time() - start_time
+    try:
+        installed_version = importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
+        installed_version = None
     
-    # Time model training
-    start_time = time.time()
-    os.system('python training.py')
-    training_time = time.time() - start_time
+    latest_version = latest_versions.get(package_name.lower(), 'Unknown')
+    outdated = None
+    required, latest = parse_version(required_version), parse_version(latest_version)
+    if required is not None and latest is not None:
+        outdated = required < latest
     
-    return [ingestion_time, training_time]
+    return {
+        'package': package_name,
+        'current_version': required_version,
+        'installed_version': installed_version,
+        'latest_version': latest_version,
+        'outdated': outdated
+    }
 
-def outdated_packages_list():
+def outdated_packages_list(config=None):
     """
     Function to check dependencies
+    
+    Works offline: installed versions come from importlib.metadata and latest
+    versions from the optional local index snapshot (package_index_snapshot).
+    Packages are checked concurrently, and the result is cached on disk for
+    dependency_cache_ttl seconds, or until requirements.txt or the snapshot changes.
     """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    snapshot_path = config.get('package_index_snapshot')
+    cache_path = config.get('dependency_cache_path', 'dependency_audit.json')
+    ttl = config.get('dependency_cache_ttl', 3600)
+    
     # Read requirements.txt
     with open('requirements.txt', 'r') as f:
-        requirements = f.read().strip().split('\n')
-    
-    outdated_packages = []
-    
-    for requirement in requirements:
-        if '==' in requirement:
-            package_name = requirement.split('==')[0]
-            current_version = requirement.split('==')[1]
-            
-            try:
-                # Get latest version using pip
-                result = subprocess.run(
-                    [sys.executable, '-m', 'pip', 'index', 'versions', package_name],
-                    capture_output=True, text=True, timeout=30
-                )
-                
-                if result.returncode == 0:
-                    # Parse the output to get latest version
-                    output_lines = result.stdout.strip().split('\n')
-                    latest_version = current_version  # Default to current if parsing fails
-                    
-                    for line in output_lines:
-                        if 'Available versions:' in line:
-                            versions = line.split('Available versions:')[1].strip()
-                            if versions:
-                                # Get the latest version (first one listed)
-                                latest_version = versions.split(',')[0].strip()
-                            break
-                    
-                    outdated_packages.append({
-                        'package': package_name,
-                        'current_version': current_version,
-                        'latest_version': latest_version
-                    })
-                else:
-                    # Fallback: use pip show
-                    result = subprocess.run(
-                        [sys.executable, '-m', 'pip', 'show', package_name],
-                        capture_output=True, text=True, timeout=30
-                    )
-                    
-                    if result.returncode == 0:
-                        lines = result.stdout.strip().split('\n')
-                        for line in lines:
-                            if line.startswith('Version:'):
-                                latest_version = line.split('Version:')[1].strip()
-                                break
-                        
-                        outdated_packages.append({
-                            'package': package_name,
-                            'current_version': current_version,
-                            'latest_version': latest_version
-                        })
-                    else:
-                        outdated_packages.append({
-                            'package': package_name,
-                            'current_version': current_version,
-                            'latest_version': 'Unknown'
-                        })
-                        
-            except Exception as e:
-                logger.warning(f"Could not check version for {package_name}: {str(e)}")
-                outdated_packages.append({
-                    'package': package_name,
-                    'current_version': current_version,
-                    'latest_version': 'Unknown'
-                })
+        requirements_text = f.read()
+    
+    snapshot_mtime = os.path.getmtime(snapshot_path) if snapshot_path and os.path.exists(snapshot_path) else None
+    cache_key = hashlib.sha256(f"{requirements_text}|{snapshot_path}|{snapshot_mtime}".encode()).hexdigest()
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+            if cached['key'] == cache_key and time.time() - cached['created'] < ttl:
+                return cached['packages']
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring unreadable dependency cache {cache_path}")
+    
+    requirements = [
+        [part.strip() for part in line.split('==', 1)]
+        for line in requirements_text.splitlines()
+        if '==' in line and not line.strip().startswith('#')
+    ]
+    latest_versions = load_package_index_snapshot(snapshot_path)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(requirements)))) as pool:
+        outdated_packages = list(pool.map(lambda req: check_package(req[0], req[1], latest_versions), requirements))
+    
+    # A temporary file unique to this call, as several server workers may refresh the cache at once
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(cache_path)}-',
+                                        dir=os.path.dirname(cache_path) or '.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'key': cache_key, 'created': time.time(), 'packages': outdated_packages}, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write dependency cache {cache_path}: {str(e)}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
     
     return outdated_packages
 
+def fetch_latest_version(package_name):
+    """
+    Function to get the latest version of a package from the package index with pip
+    """
+    result = subprocess.run(
+        [sys.executable, '-m', 'pip', 'index', 'versions', package_name],
+        capture_output=True, text=True, timeout=30
+    )
+    for line in result.stdout.splitlines():
+        if 'Available versions:' in line:
+            return [v.strip() for v in line.split('Available versions:')[1].split(',') if v.strip()]
+    return []
+
+def update_package_index_snapshot(config=None):
+    """
+    Function to write the local index snapshot; run on a host with network access
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    snapshot_path = config.get('package_index_snapshot', 'package_index.json')
+    
+    with open('requirements.txt', 'r') as f:
+        packages = [line.split('==')[0].strip() for line in f if '==' in line and not line.startswith('#')]
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        versions = dict(zip(packages, pool.map(fetch_latest_version, packages)))
+    
+    with open(snapshot_path, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'packages': {package: found for package, found in versions.items() if found}
+        }, f, indent=2)
+    logger.info(f"Package index snapshot saved to {snapshot_path}")
+
 if __name__ == '__main__':
+    if '--update-index-snapshot' in sys.argv:
+        update_package_index_snapshot()
+        sys.exit(0)
+    
     # Test the functions
     print("Testing diagnostics functions...")
     
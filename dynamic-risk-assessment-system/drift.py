@@ -0,0 +1,187 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import logging
+from scipy.stats import ks_2samp
+from datastore import apply_schema, load_final_data
+from ingestion import MANIFEST_FILE
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURES = ['lastmonth_activity', 'lastyear_activity', 'number_of_employees']
+LABEL = 'exited'
+
+# A sample of the data the deployed model was trained on, and where that data ends in the
+# final dataset, released with the model by deployment.py
+REFERENCE_FILE = 'referencedata.csv'
+REFERENCE_META_FILE = 'referencedata.json'
+
+# Rows kept in the reference sample unless drift_reference_rows is configured
+DEFAULT_REFERENCE_ROWS = 10000
+
+DEFAULT_THRESHOLDS = {
+    'psi': 0.25,
+    'ks_pvalue': 0.01,
+    'label_shift': 0.1,
+    'f1_decay': 0.05,
+    'min_rows': 5
+}
+
+# Share of a bin that is never treated as empty, so the PSI logarithm stays finite
+MIN_BIN_SHARE = 1e-4
+
+def population_stability_index(reference, current, bins=10):
+    """
+    Function to compute the population stability index of a feature on bins at the reference quantiles
+    """
+    reference = np.asarray(reference, dtype='float64')
+    current = np.asarray(current, dtype='float64')
+    
+    # Interior edges only, so values outside the reference range fall into the end bins
+    edges = np.unique(np.quantile(reference, np.linspace(0, 1, bins + 1)))[1:-1]
+    reference_share = np.bincount(np.searchsorted(edges, reference, side='right'),
+                                  minlength=len(edges) + 1) / len(reference)
+    current_share = np.bincount(np.searchsorted(edges, current, side='right'),
+                                minlength=len(edges) + 1) / len(current)
+    
+    reference_share = np.clip(reference_share, MIN_BIN_SHARE, None)
+    current_share = np.clip(current_share, MIN_BIN_SHARE, None)
+    return float(np.sum((current_share - reference_share) * np.log(current_share / reference_share)))
+
+def drift_thresholds(config=None):
+    """
+    Function to get the drift thresholds, with defaults for any not configured
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    return dict(DEFAULT_THRESHOLDS, **config.get('drift_thresholds', {}))
+
+def drift_report(reference, current, model=None, thresholds=None):
+    """
+    Function to compare new rows with the reference data and decide whether the model should be retrained
+    
+    Feature drift is measured by PSI and the two-sample KS test, label shift by
+    the change in the share of exited corporations, and, given the deployed
+    model, performance decay by the drop of its F1 score on the new rows
+    against the reference rows.
+    """
+    from scoring import f1_on
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    report = {'reference_rows': len(reference), 'new_rows': len(current), 'reasons': []}
+    
+    if len(current) < thresholds['min_rows']:
+        report['retrain'] = False
+        report['reasons'].append(f"only {len(current)} new rows, fewer than {thresholds['min_rows']}")
+        return report
+    
+    report['features'] = {}
+    for feature in FEATURES:
+        ks = ks_2samp(reference[feature], current[feature])
+        report['features'][feature] = {
+            'psi': population_stability_index(reference[feature], current[feature]),
+            'ks_statistic': float(ks.statistic),
+            'ks_pvalue': float(ks.pvalue)
+        }
+        if report['features'][feature]['psi'] > thresholds['psi']:
+            report['reasons'].append(f"{feature} PSI {report['features'][feature]['psi']:.3f} > {thresholds['psi']}")
+        if ks.pvalue < thresholds['ks_pvalue']:
+            report['reasons'].append(f"{feature} KS p-value {ks.pvalue:.4f} < {thresholds['ks_pvalue']}")
+    
+    report['label'] = {
+        'reference_rate': float(reference[LABEL].mean()),
+        'new_rate': float(current[LABEL].mean())
+    }
+    report['label']['shift'] = report['label']['new_rate'] - report['label']['reference_rate']
+    if abs(report['label']['shift']) > thresholds['label_shift']:
+        report['reasons'].append(f"label rate shifted by {report['label']['shift']:+.3f}")
+    
+    if model is not None:
+        report['performance'] = {
+            'reference_f1': f1_on(model, reference),
+            'new_f1': f1_on(model, current)
+        }
+        report['performance']['decay'] = report['performance']['reference_f1'] - report['performance']['new_f1']
+        if report['performance']['decay'] > thresholds['f1_decay']:
+            report['reasons'].append(f"F1 dropped by {report['performance']['decay']:.3f} on new rows")
+    
+    report['retrain'] = bool(report['reasons'])
+    return report
+
+def final_dataset_id(config):
+    """
+    Function to get the id of the final dataset, which changes whenever ingestion rebuilds it
+    
+    Between rebuilds the final dataset is only appended to, so rows keep their positions.
+    """
+    manifest_path = os.path.join(config['output_folder_path'], MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f).get('dataset_id')
+
+def save_reference_data(file_path, meta_path, config=None):
+    """
+    Function to write a sample of the final dataset the model was trained on, and its size, as reference data
+    
+    The sample holds at most drift_reference_rows rows, so releases do not grow
+    with the dataset. The size and dataset id locate the rows ingested after
+    the deployment without hashing the history again.
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    final_df = load_final_data(config)
+    sample_rows = config.get('drift_reference_rows', DEFAULT_REFERENCE_ROWS)
+    sample = final_df.sample(sample_rows, random_state=0).sort_index() if len(final_df) > sample_rows else final_df
+    sample.to_csv(file_path, index=False)
+    with open(meta_path, 'w') as f:
+        json.dump({'rows': len(final_df), 'sample_rows': len(sample), 'dataset_id': final_dataset_id(config)}, f)
+
+def check_drift(final_df=None, config=None):
+    """
+    Function to check the rows ingested since the last deployment for drift
+    
+    New rows are the rows of the final dataset after those the deployed model
+    was trained on, compared with the reference sample saved with it. Without
+    reference data or a deployed model there is nothing to compare with, and
+    after ingestion rebuilt the final dataset the new rows are unknown, so
+    retraining is recommended.
+    """
+    from diagnostics import load_deployed_model
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    prod_deployment_path = config['prod_deployment_path']
+    model_path = os.path.join(prod_deployment_path, 'trainedmodel.pkl')
+    try:
+        reference = apply_schema(pd.read_csv(os.path.join(prod_deployment_path, REFERENCE_FILE)))
+        with open(os.path.join(prod_deployment_path, REFERENCE_META_FILE), 'r') as f:
+            reference_meta = json.load(f)
+        model = load_deployed_model(model_path)
+    except FileNotFoundError as e:
+        logger.warning(f"Cannot check drift: {str(e)}")
+        return {'retrain': True, 'reasons': [str(e)]}
+    
+    dataset_id = final_dataset_id(config)
+    if dataset_id is None or dataset_id != reference_meta.get('dataset_id'):
+        reason = "final dataset was rebuilt since the deployment"
+        logger.warning(f"Cannot check drift: {reason}")
+        return {'retrain': True, 'reasons': [reason]}
+    
+    if final_df is None:
+        final_df = load_final_data(config)
+    current = final_df.iloc[reference_meta['rows']:]
+    
+    report = drift_report(reference, current, model, drift_thresholds(config))
+    logger.info(f"Drift check on {report['new_rows']} new rows: retrain={report['retrain']}, "
+                f"reasons={report['reasons']}")
+    return report
+
+if __name__ == '__main__':
+    print(json.dumps(check_drift(), indent=2))
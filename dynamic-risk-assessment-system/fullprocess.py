@@ -1,90 +1,99 @@
 import os
+import sys
 import json
+import fcntl
+import hashlib
+import signal
 import subprocess
+import threading
 import logging
 import time
+from contextlib import contextmanager
+from graphlib import TopologicalSorter
 from datetime import datetime
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def check_for_new_data():
+def check_for_new_data(config=None):
     """
     Check if there is new data to ingest
+    
+    A source file is new when the ingestion manifest has no record of it, and
+    changed when its content hash differs from the recorded one. Files whose
+    size and mtime match the manifest are not read, and a file that was only
+    touched is not counted as changed.
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
     input_folder_path = config['input_folder_path']
-    prod_deployment_path = config['prod_deployment_path']
-    
-    # Read list of previously ingested files
-    ingested_files_path = os.path.join(prod_deployment_path, 'ingestedfiles.txt')
-    previously_ingested = set()
-    
-    if os.path.exists(ingested_files_path):
-        with open(ingested_files_path, 'r') as f:
-            previously_ingested = set(line.strip() for line in f.readlines())
+    manifest_path = os.path.join(config['output_folder_path'], 'ingestion_manifest.json')
     
     # Check current files in input folder
-    current_files = set()
+    current_files = []
     if os.path.exists(input_folder_path):
-        current_files = set(f for f in os.listdir(input_folder_path) if f.endswith('.csv'))
-    
-    # Find new files
-    new_files = current_files - previously_ingested
-    
-    logger.info(f"Previously ingested files: {previously_ingested}")
+        current_files = sorted(f for f in os.listdir(input_folder_path) if f.endswith('.csv'))
+    
+    if not os.path.exists(manifest_path):
+        logger.info(f"No ingestion manifest, treating current files as new: {current_files}")
+        return len(current_files) > 0
+    with open(manifest_path, 'r') as f:
+        ingested = json.load(f).get('files', {})
+    
+    new_files = []
+    changed_files = []
+    for file in current_files:
+        previous = ingested.get(file)
+        if previous is None:
+            new_files.append(file)
+            continue
+        file_path = os.path.join(input_folder_path, file)
+        stat = os.stat(file_path)
+        if previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+            continue
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != previous['sha256']:
+            changed_files.append(file)
+    
+    logger.info(f"Previously ingested files: {sorted(ingested)}")
     logger.info(f"Current files: {current_files}")
-    logger.info(f"New files: {new_files}")
+    logger.info(f"New files: {new_files}, changed files: {changed_files}")
     
-    return len(new_files) > 0
+    return len(new_files) + len(changed_files) > 0
 
-def check_model_drift():
+def check_model_drift(final_df=None, isolated=False, config=None):
     """
     Check if model drift has occurred
-    """
-    # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
-    
-    prod_deployment_path = config['prod_deployment_path']
-    
-    # Read current model score
-    current_score_path = os.path.join(prod_deployment_path, 'latestscore.txt')
-    if not os.path.exists(current_score_path):
-        logger.warning("No current model score found")
-        return True  # Assume drift if no score
-    
-    with open(current_score_path, 'r') as f:
-        current_score = float(f.read().strip())
-    
-    # Run scoring on new data
-    logger.info("Running scoring on new data...")
-    result = subprocess.run(['python', 'scoring.py'], capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        logger.error(f"Scoring failed: {result.stderr}")
-        return True  # Assume drift if scoring fails
     
-    # Read new score
-    output_model_path = config['output_model_path']
-    new_score_path = os.path.join(output_model_path, 'latestscore.txt')
-    
-    if not os.path.exists(new_score_path):
-        logger.warning("No new model score found")
-        return True  # Assume drift if no new score
-    
-    with open(new_score_path, 'r') as f:
-        new_score = float(f.read().strip())
-    
-    logger.info(f"Current score: {current_score}, New score: {new_score}")
-    
-    # Check for drift (new score is lower)
-    drift_detected = new_score < current_score
-    logger.info(f"Model drift detected: {drift_detected}")
+    Compares the rows ingested since the last deployment with the data the
+    deployed model was trained on (see drift.py). Drift is reported when
+    feature drift, label shift or the deployed model's F1 decay on the new rows
+    crosses the configured drift_thresholds. With isolated, drift.py runs in a
+    subprocess.
+    """
+    try:
+        if isolated:
+            result = subprocess.run(['python', 'drift.py'], capture_output=True, text=True)
+            if result.returncode != 0:
+                logger.error(f"Drift check failed: {result.stderr}")
+                return True  # Assume drift if the check fails
+            report = json.loads(result.stdout)
+        else:
+            from drift import check_drift
+            report = check_drift(final_df, config)
+    except Exception as e:
+        logger.error(f"Drift check failed: {str(e)}")
+        return True  # Assume drift if the check fails
+    
+    drift_detected = report['retrain']
+    logger.info(f"Model drift detected: {drift_detected} {report['reasons']}")
     
     return drift_detected
 
@@ -116,6 +125,20 @@ def run_training():
     logger.info("Model training completed successfully")
     return True
 
+def run_scoring():
+    """
+    Run scoring of the re-trained model
+    """
+    logger.info("Running model scoring...")
+    result = subprocess.run(['python', 'scoring.py'], capture_output=True, text=True)
+    
+    if result.returncode != 0:
+        logger.error(f"Scoring failed: {result.stderr}")
+        return False
+    
+    logger.info("Model scoring completed successfully")
+    return True
+
 def run_deployment():
     """
     Run model deployment
@@ -151,58 +174,272 @@ def run_diagnostics_and_reporting():
     logger.info("Diagnostics and reporting completed successfully")
     return True
 
-def main():
+def run_subprocess_pipeline(config=None):
     """
-    Main function to run the full process
-    """
-    logger.info("Starting full process automation...")
-    start_time = time.time()
+    Run the pipeline with each stage script in its own interpreter
     
+    Returns True when every step completed.
+    """
     # Step 1: Check for new data
     logger.info("Step 1: Checking for new data...")
-    has_new_data = check_for_new_data()
+    has_new_data = check_for_new_data(config)
     
     if not has_new_data:
         logger.info("No new data found. Exiting process.")
-        return
+        return False
     
     # Step 2: Ingest new data
     logger.info("Step 2: Ingesting new data...")
     if not run_ingestion():
         logger.error("Data ingestion failed. Exiting process.")
-        return
+        return False
     
     # Step 3: Check for model drift
     logger.info("Step 3: Checking for model drift...")
-    drift_detected = check_model_drift()
+    drift_detected = check_model_drift(isolated=True)
     
     if not drift_detected:
         logger.info("No model drift detected. Current model is still good.")
-        return
+        return False
     
-    # Step 4: Re-train model
+    # Step 4: Re-train and re-score model
     logger.info("Step 4: Re-training model...")
-    if not run_training():
+    if not run_training() or not run_scoring():
         logger.error("Model training failed. Exiting process.")
-        return
+        return False
     
     # Step 5: Re-deploy model
     logger.info("Step 5: Re-deploying model...")
     if not run_deployment():
         logger.error("Model deployment failed. Exiting process.")
-        return
+        return False
     
     # Step 6: Run diagnostics and reporting
     logger.info("Step 6: Running diagnostics and reporting...")
     if not run_diagnostics_and_reporting():
         logger.error("Diagnostics and reporting failed.")
-        return
+        return False
     
-    end_time = time.time()
-    total_time = end_time - start_time
+    return True
+
+def run_dag(stages):
+    """
+    Run stages in dependency order, passing each stage the results of the stages it depends on
     
-    logger.info(f"Full process completed successfully in {total_time:.2f} seconds")
+    stages maps a stage name to (function, names of the stages it depends on);
+    the function is called with their results in that order. A stage that
+    returns False or raises is not retried, and every stage depending on it,
+    directly or not, is skipped. Returns the results and the wall time in
+    seconds of each stage that ran.
+    """
+    results = {}
+    timings = {}
+    graph = {name: dependencies for name, (_, dependencies) in stages.items()}
+    for name in TopologicalSorter(graph).static_order():
+        func, dependencies = stages[name]
+        if any(dependency not in results or results[dependency] is False for dependency in dependencies):
+            logger.info(f"Skipping stage {name}")
+            continue
+        
+        start_time = time.perf_counter()
+        try:
+            results[name] = func(*[results[dependency] for dependency in dependencies])
+        except Exception as e:
+            logger.error(f"Stage {name} failed: {str(e)}")
+            results[name] = False
+        timings[name] = time.perf_counter() - start_time
+        logger.info(f"Stage {name} finished in {timings[name]:.2f} seconds")
+    
+    return results, timings
 
-if __name__ == '__main__':
-    main()
+def in_process_stages(config):
+    """
+    Build the pipeline as a DAG of stage functions run in this process
+    
+    The final dataset, the test data and the re-trained model are handed from
+    stage to stage in memory instead of being re-read by each stage script.
+    The checks for new data and drift return False to skip the rest.
+    """
+    # Imported here so a run without new data does not pay for pandas, sklearn and matplotlib
+    from datastore import cached_dataset
+    from ingestion import merge_multiple_dataframe
+    from training import train_model
+    from scoring import score_model
+    from deployment import store_model_into_pickle
+    from reporting import plot_confusion_matrix, generate_pdf_report
+    from apicalls import call_api_endpoints
+    
+    def ingest(has_new_data):
+        return merge_multiple_dataframe(config=config) is not None
+    
+    def load(folder, name):
+        return lambda ingested: cached_dataset(config[folder], name, config)[0]
+    
+    def drift(final_df):
+        return check_model_drift(final_df, config=config)
+    
+    def train(drift_detected, final_df):
+        model = train_model(df=final_df, config=config)
+        return False if model is None else model
+    
+    def score(model, test_df):
+        return score_model(model=model, df=test_df, config=config) is not None
+    
+    def deploy(scored):
+        return store_model_into_pickle(config) is not None
+    
+    def report(deployed):
+        plot_confusion_matrix(config)
+        return generate_pdf_report(config) is not None
+    
+    def call_api(reported):
+        return call_api_endpoints(config)
+    
+    return {
+        'new_data': (lambda: check_for_new_data(config), []),
+        'ingestion': (ingest, ['new_data']),
+        'final_data': (load('output_folder_path', 'finaldata'), ['ingestion']),
+        'test_data': (load('test_data_path', 'testdata'), ['ingestion']),
+        'drift': (drift, ['final_data']),
+        'training': (train, ['drift', 'final_data']),
+        'scoring': (score, ['training', 'test_data']),
+        'deployment': (deploy, ['scoring']),
+        'reporting': (report, ['deployment']),
+        'apicalls': (call_api, ['reporting'])
+    }
+
+@contextmanager
+def pipeline_lock(lock_path):
+    """
+    Hold an exclusive lock on a file while the pipeline runs, yielding whether it was acquired
+    
+    The lock is released by the OS when the process exits, so a crashed run
+    never leaves it stuck.
+    """
+    with open(lock_path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def source_snapshot(folder):
+    """
+    Get the size and modification time of each CSV file in a folder
+    """
+    if not os.path.isdir(folder):
+        return {}
+    with os.scandir(folder) as entries:
+        return {
+            entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in entries if entry.name.endswith('.csv') and entry.is_file()
+        }
 
+def watch_source_folder(folder, run, poll_seconds=5, debounce_seconds=30, stop=None):
+    """
+    Watch a folder and call run once new or changed CSV files have stopped arriving
+    
+    The folder is polled every poll_seconds, which costs one directory listing.
+    A burst of arrivals triggers a single run once the folder has been
+    unchanged for debounce_seconds. The first run happens at start-up, for files
+    that arrived while nothing was watching. A run that returns False did not
+    happen, e.g. because another run held the pipeline lock, and is retried on
+    the next poll. Returns the number of runs when stop is set.
+    """
+    stop = stop or threading.Event()
+    current = source_snapshot(folder)
+    changed_at = time.monotonic()
+    processed = None
+    runs = 0
+    
+    logger.info(f"Watching {folder} every {poll_seconds}s with a {debounce_seconds}s debounce")
+    while not stop.is_set():
+        snapshot = source_snapshot(folder)
+        if snapshot != current:
+            current = snapshot
+            changed_at = time.monotonic()
+        elif current != processed and time.monotonic() - changed_at >= debounce_seconds:
+            try:
+                ran = run() is not False
+            except Exception as e:
+                logger.error(f"Pipeline run failed: {str(e)}")
+                ran = True
+            if ran:
+                processed = current
+                runs += 1
+            else:
+                logger.info("Pipeline run skipped, retrying on the next poll")
+        stop.wait(poll_seconds)
+    
+    return runs
+
+def main(mode=None):
+    """
+    Main function to run the full process
+    
+    By default (pipeline_mode "in_process") the stages run as a DAG in this
+    process. The "subprocess" mode, also selected with --subprocess, runs each
+    stage script in its own interpreter for isolation. A run is skipped while
+    another one holds the pipeline lock. Returns whether the run happened.
+    """
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    mode = mode or config.get('pipeline_mode', 'in_process')
+    
+    with pipeline_lock(config.get('pipeline_lock_path', 'fullprocess.lock')) as locked:
+        if not locked:
+            logger.warning("Another pipeline run is in progress. Exiting process.")
+            return False
+        
+        logger.info(f"Starting full process automation ({mode})...")
+        start_time = time.time()
+        
+        # Stages, in this process or as subprocesses inheriting the id, group their timings per run
+        os.environ['PIPELINE_RUN_ID'] = datetime.now().strftime('%Y%m%dT%H%M%S')
+        
+        if mode == 'subprocess':
+            completed = run_subprocess_pipeline(config)
+        else:
+            results, timings = run_dag(in_process_stages(config))
+            logger.info("Stage timings: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+            completed = 'apicalls' in results and results['apicalls'] is not False
+        
+        if not completed:
+            return True
+        
+        end_time = time.time()
+        total_time = end_time - start_time
+        
+        logger.info(f"Full process completed successfully in {total_time:.2f} seconds")
+        return True
+
+def watch(mode=None):
+    """
+    Run the pipeline whenever new source data settles, until SIGTERM or Ctrl-C
+    
+    Modules and the model, dataset and statistics caches stay loaded between
+    runs, so an in-process run after the first skips interpreter and import
+    start-up.
+    """
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        watch_source_folder(config['input_folder_path'], lambda: main(mode),
+                            config.get('watch_poll_seconds', 5), config.get('watch_debounce_seconds', 30), stop)
+    except KeyboardInterrupt:
+        pass
+    logger.info("Stopped watching for new data")
+
+if __name__ == '__main__':
+    mode = 'subprocess' if '--subprocess' in sys.argv else None
+    if '--watch' in sys.argv:
+        watch(mode)
+    else:
+        main(mode)
@@ -0,0 +1,16 @@
+import os
+import multiprocessing
+
+# Multi-worker serving of the API: gunicorn -c gunicorn.conf.py wsgi:app
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+# Processes for CPU-bound scoring, threads for requests waiting on I/O
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * multiprocessing.cpu_count() + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# Create the app, and with it the cached model and datasets, once in the master;
+# the forked workers share those pages until they write to them
+preload_app = True
+
+timeout = 120
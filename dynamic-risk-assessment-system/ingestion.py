@@ -2,20 +2,258 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import hashlib
+import sys
+import uuid
 from datetime import datetime
 import logging
+from stage_timing import timed_stage
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datastore import write_dataset, append_dataset, dataset_state, restore_dataset_state, DatasetWriter, convert_dataset
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def merge_multiple_dataframe():
+MANIFEST_FILE = 'ingestion_manifest.json'
+ROW_INDEX_FILE = 'row_hashes.npy'
+
+def file_signature(file_path):
+    """
+    Function to get the size, modification time and content hash of a file
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha256': digest.hexdigest()
+    }
+
+def row_hashes(df):
+    """
+    Function to hash each row of a dataframe
+    """
+    # Hash numbers as float so 1 and 1.0 read from different files match, like drop_duplicates after concat
+    normalized = df.copy()
+    for col in normalized.columns:
+        if pd.api.types.is_numeric_dtype(normalized[col]):
+            normalized[col] = normalized[col].astype('float64')
+    
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+def read_source_file(file_path, previous_sha256=None):
+    """
+    Function to hash and read one source file, skipping the read if its content is unchanged
+    """
+    result = {'signature': file_signature(file_path), 'df': None, 'error': None}
+    if result['signature']['sha256'] == previous_sha256:
+        return result
+    
+    # Errors are returned rather than raised so one bad file does not stop the others
+    try:
+        result['df'] = pd.read_csv(file_path)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def read_source_files(file_paths, previous_hashes, workers=1, executor='thread'):
+    """
+    Function to read source files in a thread or process pool, returning results in input order
+    """
+    if workers <= 1 or len(file_paths) <= 1:
+        return [read_source_file(p, h) for p, h in zip(file_paths, previous_hashes)]
+    
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    with pool_class(max_workers=min(workers, len(file_paths))) as pool:
+        return list(pool.map(read_source_file, file_paths, previous_hashes))
+
+def load_manifest(config):
+    """
+    Function to load the ingestion manifest and row-hash index
+    """
+    output_folder_path = config['output_folder_path']
+    manifest_path = os.path.join(output_folder_path, MANIFEST_FILE)
+    index_path = os.path.join(output_folder_path, ROW_INDEX_FILE)
+    
+    if not all(os.path.exists(p) for p in [manifest_path, index_path]):
+        return None, None
+    
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    
+    # Roll back a partial append left by an interrupted run
+    if 'dataset' not in manifest or not restore_dataset_state(output_folder_path, 'finaldata', manifest['dataset'], config):
+        logger.warning("Final dataset does not match the manifest")
+        return None, None
+    
+    return manifest, np.load(index_path)
+
+def save_manifest(config, manifest, hashes):
+    """
+    Function to save the ingestion manifest and row-hash index
+    """
+    output_folder_path = config['output_folder_path']
+    manifest['dataset'] = dataset_state(output_folder_path, 'finaldata', config)
+    manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    
+    # Write to temporary files first so a crash never leaves a torn manifest
+    index_path = os.path.join(output_folder_path, ROW_INDEX_FILE)
+    with open(index_path + '.tmp', 'wb') as f:
+        np.save(f, hashes)
+    os.replace(index_path + '.tmp', index_path)
+    
+    manifest_path = os.path.join(output_folder_path, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+def merge_source_files(config, files, manifest, known_hashes):
+    """
+    Function to read whole source files, deduplicate their rows and append them to the final dataset
+    """
+    output_folder_path = config['output_folder_path']
+    input_folder_path = config['input_folder_path']
+    results = read_source_files(
+        [os.path.join(input_folder_path, file) for file in files],
+        [manifest['files'].get(file, {}).get('sha256') for file in files],
+        workers=config.get('ingestion_workers', 1),
+        executor=config.get('ingestion_executor', 'thread')
+    )
+    
+    read_files = []
+    dataframes = []
+    signatures = {}
+    for file, result in zip(files, results):
+        if result['error'] is not None:
+            logger.error(f"Error reading {file}: {result['error']}")
+            continue
+        
+        read_files.append(file)
+        if result['df'] is None:
+            # Touched but unchanged
+            manifest['files'][file].update(result['signature'])
+            continue
+        
+        df = result['df']
+        dataframes.append(df)
+        signatures[file] = dict(result['signature'], rows=len(df))
+        logger.info(f"Successfully read {file} with {len(df)} rows")
+    
+    if not dataframes:
+        logger.info("No new or changed files, final dataset is up to date")
+        return read_files, known_hashes, 0
+    
+    new_df = pd.concat(dataframes, ignore_index=True)
+    logger.info(f"New data shape: {new_df.shape}")
+    
+    if manifest['columns'] is not None and list(new_df.columns) != manifest['columns']:
+        return None
+    
+    # Remove duplicates within the new rows and against everything ingested before
+    hashes = row_hashes(new_df)
+    keep = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, known_hashes)
+    new_df = new_df[keep]
+    logger.info(f"Removed {int((~keep).sum())} duplicate rows")
+    
+    # Append to the final dataset
+    if manifest['columns'] is not None:
+        append_dataset(new_df, output_folder_path, 'finaldata', config)
+    else:
+        write_dataset(new_df, output_folder_path, 'finaldata', config)
+    logger.info(f"Appended {len(new_df)} rows to the final dataset in {output_folder_path}")
+    
+    manifest['columns'] = list(new_df.columns)
+    manifest['files'].update(signatures)
+    return read_files, np.concatenate([known_hashes, hashes[keep]]), len(new_df)
+
+def stream_source_files(config, files, manifest, known_hashes):
+    """
+    Function to ingest source files in fixed-size chunks with bounded memory
+    
+    Each chunk is deduplicated against a sorted row-hash index and written out
+    before the next one is read, so peak memory is set by ingestion_chunk_rows
+    plus 8 bytes per unique row in the index, whatever the size of the input.
+    """
+    input_folder_path = config['input_folder_path']
+    chunk_rows = config['ingestion_chunk_rows']
+    append = manifest['columns'] is not None
+    writer = DatasetWriter(config['output_folder_path'], 'finaldata', append=append, config=config)
+    known_hashes = np.sort(known_hashes)
+    
+    read_files = []
+    duplicates = 0
+    try:
+        for file in files:
+            file_path = os.path.join(input_folder_path, file)
+            previous = manifest['files'].get(file)
+            signature = file_signature(file_path)
+            if previous and previous['sha256'] == signature['sha256']:
+                # Touched but unchanged
+                manifest['files'][file].update(signature)
+                read_files.append(file)
+                continue
+            
+            rows = 0
+            try:
+                for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+                    if manifest['columns'] is None:
+                        manifest['columns'] = list(chunk.columns)
+                    if list(chunk.columns) != manifest['columns']:
+                        if append:
+                            return None
+                        raise ValueError(f"columns {list(chunk.columns)} differ from {manifest['columns']}")
+                    
+                    # Remove duplicates within the chunk and against everything written before
+                    hashes = row_hashes(chunk)
+                    positions = np.minimum(np.searchsorted(known_hashes, hashes), max(len(known_hashes) - 1, 0))
+                    seen = known_hashes[positions] == hashes if len(known_hashes) else np.zeros(len(hashes), bool)
+                    keep = ~pd.Series(hashes).duplicated().to_numpy() & ~seen
+                    if keep.any():
+                        writer.write(chunk[keep])
+                        # Stable sort merges the two sorted runs in linear time
+                        known_hashes = np.sort(np.concatenate([known_hashes, np.sort(hashes[keep])]), kind='stable')
+                    duplicates += int((~keep).sum())
+                    rows += len(chunk)
+            except Exception as e:
+                # Rows written before the error are kept; a retry of the file deduplicates them
+                logger.error(f"Error reading {file}: {str(e)}")
+                continue
+            
+            read_files.append(file)
+            manifest['files'][file] = dict(signature, rows=rows)
+            logger.info(f"Streamed {file} with {rows} rows in chunks of {chunk_rows}")
+    finally:
+        writer.close()
+    
+    if writer.rows or duplicates:
+        logger.info(f"Removed {duplicates} duplicate rows")
+        logger.info(f"Appended {writer.rows} rows to the final dataset in {config['output_folder_path']}")
+    else:
+        logger.info("No new or changed files, final dataset is up to date")
+    return read_files, known_hashes, writer.rows
+
+@timed_stage('ingestion')
+def merge_multiple_dataframe(full_refresh=False, config=None):
     """
     Function for data ingestion
+    
+    Only files that are new or changed since the last run (by size, mtime and
+    content hash in the manifest) are read, in parallel when ingestion_workers
+    is above 1. Their rows are deduplicated against a persistent row-hash index
+    of everything already ingested and appended to the final dataset (see
+    datastore.py). Returns the number of rows added in this run, in both
+    whole-file and streaming mode (ingestion_chunk_rows), or None when there
+    are no files to ingest; read the dataset itself with load_final_data.
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
     input_folder_path = config['input_folder_path']
     output_folder_path = config['output_folder_path']
@@ -24,42 +262,45 @@ def merge_multiple_dataframe():
     logger.info("Starting data ingestion process")
     
     # Get list of all CSV files in input folder
-    csv_files = [f for f in os.listdir(input_folder_path) if f.endswith('.csv')]
+    csv_files = sorted(f for f in os.listdir(input_folder_path) if f.endswith('.csv'))
     logger.info(f"Found {len(csv_files)} CSV files: {csv_files}")
     
-    # Read and combine all CSV files
-    dataframes = []
-    ingested_files = []
+    os.makedirs(output_folder_path, exist_ok=True)
+    manifest, known_hashes = (None, None) if full_refresh else load_manifest(config)
+    if manifest is None:
+        logger.info("No usable ingestion manifest, rebuilding the final dataset from all files")
+        manifest = {'files': {}, 'columns': None}
+        known_hashes = np.empty(0, dtype=np.uint64)
+    # A new id tells readers that rows may have moved, e.g. drift checks that locate new rows by position
+    manifest.setdefault('dataset_id', uuid.uuid4().hex)
     
+    # Skip files whose size and mtime match the manifest
+    ingested_files = []
+    changed_files = []
     for file in csv_files:
-        file_path = os.path.join(input_folder_path, file)
-        try:
-            df = pd.read_csv(file_path)
-            dataframes.append(df)
+        previous = manifest['files'].get(file)
+        stat = os.stat(os.path.join(input_folder_path, file))
+        if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
             ingested_files.append(file)
-            logger.info(f"Successfully read {file} with {len(df)} rows")
-        except Exception as e:
-            logger.error(f"Error reading {file}: {str(e)}")
+        else:
+            changed_files.append(file)
     
-    if not dataframes:
+    # Read new and changed files only, whole or in chunks
+    ingest = stream_source_files if config.get('ingestion_chunk_rows') else merge_source_files
+    merged = ingest(config, changed_files, manifest, known_hashes)
+    if merged is None:
+        logger.warning("New files have different columns, rebuilding the final dataset")
+        return merge_multiple_dataframe(full_refresh=True, config=config)
+    
+    read_files, known_hashes, new_rows = merged
+    ingested_files = sorted(ingested_files + read_files)
+    if not ingested_files:
         logger.error("No valid CSV files found to process")
         return
     
-    # Combine all dataframes
-    final_df = pd.concat(dataframes, ignore_index=True)
-    logger.info(f"Combined dataset shape: {final_df.shape}")
-    
-    # Remove duplicates
-    initial_rows = len(final_df)
-    final_df = final_df.drop_duplicates()
-    final_rows = len(final_df)
-    logger.info(f"Removed {initial_rows - final_rows} duplicate rows")
-    
-    # Save final dataset
-    os.makedirs(output_folder_path, exist_ok=True)
-    final_data_path = os.path.join(output_folder_path, 'finaldata.csv')
-    final_df.to_csv(final_data_path, index=False)
-    logger.info(f"Final dataset saved to {final_data_path}")
+    manifest['rows'] = int(len(known_hashes))
+    save_manifest(config, manifest, known_hashes)
+    logger.info(f"Final dataset has {manifest['rows']} rows")
     
     # Save record of ingested files
     ingested_files_path = os.path.join(output_folder_path, 'ingestedfiles.txt')
@@ -68,8 +309,11 @@ def merge_multiple_dataframe():
             f.write(file + '\n')
     logger.info(f"Ingested files record saved to {ingested_files_path}")
     
-    return final_df
+    # Readers never convert, so keep the test data's columnar copy in step here
+    convert_dataset(config['test_data_path'], 'testdata', config)
+    
+    return new_rows
 
 if __name__ == '__main__':
-    merge_multiple_dataframe()
+    merge_multiple_dataframe(full_refresh='--full-refresh' in sys.argv)
 
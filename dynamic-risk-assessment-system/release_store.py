@@ -0,0 +1,181 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+import logging
+from diagnostics import file_sha256
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BLOBS_DIR = 'blobs'
+RELEASES_DIR = 'releases'
+CURRENT_LINK = 'current'
+HISTORY_FILE = 'releases.jsonl'
+MANIFEST_FILE = 'manifest.json'
+
+def store_blob(store_path, file_path):
+    """
+    Function to add a file to the blob store under its content hash, skipping it when already stored
+    """
+    sha256 = file_sha256(file_path)
+    blob_path = os.path.join(store_path, BLOBS_DIR, sha256)
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Copy then rename so a blob is never seen half written; read-only, as releases share it
+        shutil.copy2(file_path, blob_path + '.tmp')
+        os.chmod(blob_path + '.tmp', 0o444)
+        os.replace(blob_path + '.tmp', blob_path)
+        logger.info(f"Stored blob {sha256[:12]} from {file_path}")
+    return sha256
+
+def create_release(store_path, artifacts):
+    """
+    Function to create a release of the given files, named by the hash of their names and contents
+    
+    artifacts maps a file name in the release to the path of its content. An
+    identical release that already exists is reused. Files are hard links to
+    their blobs, copied where hard links are not supported, and the release
+    directory is renamed into place once complete. Returns the release id and
+    whether it was new.
+    """
+    files = {name: store_blob(store_path, path) for name, path in sorted(artifacts.items())}
+    release_id = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:16]
+    release_path = os.path.join(store_path, RELEASES_DIR, release_id)
+    if os.path.isdir(release_path):
+        return release_id, False
+    
+    os.makedirs(os.path.dirname(release_path), exist_ok=True)
+    staging_path = tempfile.mkdtemp(prefix=f'.{release_id}-', dir=os.path.dirname(release_path))
+    for name, sha256 in files.items():
+        blob_path = os.path.join(store_path, BLOBS_DIR, sha256)
+        try:
+            os.link(blob_path, os.path.join(staging_path, name))
+        except OSError:
+            shutil.copy2(blob_path, os.path.join(staging_path, name))
+    with open(os.path.join(staging_path, MANIFEST_FILE), 'w') as f:
+        json.dump({'release': release_id, 'files': files, 'created_at': datetime.now().isoformat(timespec='seconds')},
+                  f, indent=2)
+    os.chmod(staging_path, 0o755)
+    
+    try:
+        os.rename(staging_path, release_path)
+    except OSError:
+        # Created meanwhile by a concurrent deployment of the same files
+        shutil.rmtree(staging_path)
+        return release_id, False
+    logger.info(f"Created release {release_id} with {sorted(files)}")
+    return release_id, True
+
+def replace_with_symlink(target, link_path):
+    """
+    Function to point a symlink at target, atomically replacing whatever was at link_path
+    """
+    tmp_path = f'{link_path}.{os.getpid()}.tmp'
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.symlink(target, tmp_path)
+    os.replace(tmp_path, link_path)
+
+def current_release(store_path):
+    """
+    Function to get the id of the active release, or None before the first release
+    """
+    link_path = os.path.join(store_path, CURRENT_LINK)
+    if not os.path.islink(link_path):
+        return None
+    return os.path.basename(os.readlink(link_path))
+
+def release_history(store_path):
+    """
+    Function to get the activated releases, oldest first
+    """
+    history_path = os.path.join(store_path, HISTORY_FILE)
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def release_files(store_path, release_id):
+    """
+    Function to get the content hash of each file in a release
+    """
+    with open(os.path.join(store_path, RELEASES_DIR, release_id, MANIFEST_FILE), 'r') as f:
+        return json.load(f)['files']
+
+def activate_release(store_path, release_id, action='deploy'):
+    """
+    Function to make a release current by switching one symlink
+    
+    The files in the deployment folder are symlinks through the "current"
+    link, so readers see either the old or the new release as a whole, never
+    a mix of the two or a half-copied file.
+    """
+    files = release_files(store_path, release_id)
+    replace_with_symlink(os.path.join(RELEASES_DIR, release_id), os.path.join(store_path, CURRENT_LINK))
+    
+    # Files of an earlier layout, or new in this release, become links through "current"
+    for name in files:
+        link_path = os.path.join(store_path, name)
+        target = os.path.join(CURRENT_LINK, name)
+        if not (os.path.islink(link_path) and os.readlink(link_path) == target):
+            replace_with_symlink(target, link_path)
+    
+    with open(os.path.join(store_path, HISTORY_FILE), 'a') as f:
+        f.write(json.dumps({'release': release_id, 'action': action,
+                            'activated_at': datetime.now().isoformat(timespec='seconds')}) + '\n')
+    logger.info(f"Release {release_id} is now current ({action})")
+
+def rollback_release(store_path, release_id=None):
+    """
+    Function to make an earlier release current again, by default the one before the current release
+    """
+    current = current_release(store_path)
+    if release_id is None:
+        previous = [entry['release'] for entry in release_history(store_path) if entry['release'] != current]
+        if not previous:
+            raise ValueError("No earlier release to roll back to")
+        release_id = previous[-1]
+    
+    if not os.path.isdir(os.path.join(store_path, RELEASES_DIR, release_id)):
+        raise ValueError(f"Release {release_id} not found")
+    activate_release(store_path, release_id, action='rollback')
+    return release_id
+
+def prune_releases(store_path, keep=10):
+    """
+    Function to delete all but the most recently activated releases and the blobs no release uses
+    """
+    recent = []
+    for entry in reversed(release_history(store_path)):
+        if entry['release'] not in recent:
+            recent.append(entry['release'])
+    kept = set(recent[:keep]) | {current_release(store_path)}
+    
+    releases_path = os.path.join(store_path, RELEASES_DIR)
+    for release_id in os.listdir(releases_path):
+        if release_id not in kept and not release_id.startswith('.'):
+            shutil.rmtree(os.path.join(releases_path, release_id))
+            logger.info(f"Pruned release {release_id}")
+    
+    used = {sha256 for release_id in os.listdir(releases_path) if not release_id.startswith('.')
+            for sha256 in release_files(store_path, release_id).values()}
+    blobs_path = os.path.join(store_path, BLOBS_DIR)
+    for blob in os.listdir(blobs_path):
+        if blob not in used and not blob.endswith('.tmp'):
+            os.remove(os.path.join(blobs_path, blob))
+
+def publish_release(store_path, artifacts, keep=10):
+    """
+    Function to store the given files as a release, make it current and prune old releases
+    """
+    release_id, _ = create_release(store_path, artifacts)
+    if release_id == current_release(store_path):
+        logger.info(f"Release {release_id} is already current")
+    else:
+        activate_release(store_path, release_id)
+    prune_releases(store_path, keep)
+    return release_id
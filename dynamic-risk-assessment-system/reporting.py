@@ -3,6 +3,8 @@ import numpy as np
 import json
 import os
 import logging
+from stage_timing import timed_stage
+from datastore import load_test_data
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import confusion_matrix, classification_report
@@ -16,30 +18,29 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def plot_confusion_matrix():
+def plot_confusion_matrix(config=None):
     """
     Function to generate confusion matrix plot
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
-    test_data_path = config['test_data_path']
     output_model_path = config['output_model_path']
     
     # Import diagnostics functions
     from diagnostics import model_predictions
     
     # Read test data
-    test_data_file = os.path.join(test_data_path, 'testdata.csv')
-    if not os.path.exists(test_data_file):
-        logger.error(f"Test data file not found at {test_data_file}")
+    try:
+        df = load_test_data(config)
+    except FileNotFoundError as e:
+        logger.error(str(e))
         return
     
-    df = pd.read_csv(test_data_file)
-    
     # Get predictions
-    predictions = model_predictions(df)
+    predictions = model_predictions(df, config)
     actual = df['exited'].tolist()
     
     # Create confusion matrix
@@ -64,20 +65,23 @@ def plot_confusion_matrix():
     
     return plot_path
 
-def generate_pdf_report():
+@timed_stage('reporting')
+def generate_pdf_report(config=None):
     """
     Function to generate PDF report
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
     output_model_path = config['output_model_path']
     output_folder_path = config['output_folder_path']
     prod_deployment_path = config['prod_deployment_path']
     
     # Import diagnostics functions
-    from diagnostics import dataframe_summary, missing_data, execution_time, outdated_packages_list
+    from diagnostics import dataframe_summary, missing_data, outdated_packages_list
+    from stage_timing import timing_trends
     
     # Create PDF
     pdf_path = os.path.join(output_model_path, 'model_report.pdf')
@@ -116,7 +120,7 @@ def generate_pdf_report():
         story.append(Spacer(1, 12))
     
     # Summary Statistics
-    summary = dataframe_summary()
+    summary = dataframe_summary(config)
     if summary:
         story.append(Paragraph("<b>Summary Statistics:</b>", styles['Heading2']))
         for stat in summary:
@@ -126,7 +130,7 @@ def generate_pdf_report():
         story.append(Spacer(1, 12))
     
     # Missing Data
-    missing = missing_data()
+    missing = missing_data(config)
     if missing:
         story.append(Paragraph("<b>Missing Data Percentages:</b>", styles['Heading2']))
         for i, pct in enumerate(missing):
@@ -135,16 +139,21 @@ def generate_pdf_report():
             story.append(missing_para)
         story.append(Spacer(1, 12))
     
-    # Execution Times
-    timing = execution_time()
-    if timing:
-        timing_text = f"Ingestion Time: {timing[0]:.2f} seconds, Training Time: {timing[1]:.2f} seconds"
-        timing_para = Paragraph(f"<b>Execution Times:</b> {timing_text}", styles['Normal'])
-        story.append(timing_para)
+    # Execution Times of the latest pipeline runs
+    trends = timing_trends(config=config)
+    if trends:
+        story.append(Paragraph("<b>Execution Times:</b>", styles['Heading2']))
+        for stage, trend in trends.items():
+            latest = trend['latest']
+            timing_text = (f"{stage}: {latest['wall_seconds']:.2f}s wall, {latest['cpu_seconds']:.2f}s CPU, "
+                           f"{latest['peak_memory_mb']:.0f} MB peak")
+            if trend['wall_trend'] is not None:
+                timing_text += f" ({trend['wall_trend']:.2f}x the median of recent runs)"
+            story.append(Paragraph(timing_text, styles['Normal']))
         story.append(Spacer(1, 12))
     
     # Package Versions
-    packages = outdated_packages_list()
+    packages = outdated_packages_list(config)
     if packages:
         story.append(Paragraph("<b>Package Versions:</b>", styles['Heading2']))
         for pkg in packages:
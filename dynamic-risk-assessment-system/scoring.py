@@ -3,52 +3,68 @@ import numpy as np
 import json
 import pickle
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 import logging
+from stage_timing import timed_stage
+from datastore import load_test_data, cached_dataset
 from sklearn.metrics import f1_score
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def score_model():
+# F1 scores per (model hash, test data hash), and test data hashes per dataset signature
+MAX_SCORES = 32
+_score_cache = OrderedDict()
+_data_hashes = {}
+_score_cache_lock = threading.Lock()
+
+def f1_on(model, df):
+    """
+    Function to compute the F1 score of a model on a labelled dataframe
+    """
+    feature_columns = [col for col in df.columns if col not in ['corporation', 'exited']]
+    return float(f1_score(df['exited'], model.predict(df[feature_columns])))
+
+@timed_stage('scoring')
+def score_model(model=None, df=None, config=None):
     """
     Function for scoring the model
+    
+    Scores the given model on the given test data, reading the trained model
+    and the test data for whichever is not passed in.
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
-    test_data_path = config['test_data_path']
     output_model_path = config['output_model_path']
     
     # Read test data
-    test_data_file = os.path.join(test_data_path, 'testdata.csv')
-    if not os.path.exists(test_data_file):
-        logger.error(f"Test data file not found at {test_data_file}")
-        return
+    if df is None:
+        try:
+            df = load_test_data(config)
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            return
     
-    df = pd.read_csv(test_data_file)
     logger.info(f"Loaded test data with shape: {df.shape}")
     
     # Load trained model
-    model_path = os.path.join(output_model_path, 'trainedmodel.pkl')
-    if not os.path.exists(model_path):
-        logger.error(f"Trained model not found at {model_path}")
-        return
-    
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
-    
-    # Prepare features and target
-    feature_columns = [col for col in df.columns if col not in ['corporation', 'exited']]
-    X = df[feature_columns]
-    y = df['exited']
-    
-    # Make predictions
-    y_pred = model.predict(X)
+    if model is None:
+        model_path = os.path.join(output_model_path, 'trainedmodel.pkl')
+        if not os.path.exists(model_path):
+            logger.error(f"Trained model not found at {model_path}")
+            return
+        
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
     
     # Calculate F1 score
-    f1 = f1_score(y, y_pred)
+    f1 = f1_on(model, df)
     
     logger.info(f"F1 score on test data: {f1:.4f}")
     
@@ -61,6 +77,53 @@ def score_model():
     
     return f1
 
+def score_deployed_model(config=None):
+    """
+    Function to score the deployed model on the test data, memoized on the model and test data hashes
+    
+    A score is only computed when the content of the deployed model or of the
+    test data changes, and nothing is written to disk; the pipeline's scoring
+    run (score_model) still writes latestscore.txt.
+    """
+    from diagnostics import load_deployed_model_version
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    
+    model_path = os.path.join(config['prod_deployment_path'], 'trainedmodel.pkl')
+    model, model_hash = load_deployed_model_version(model_path)
+    df, signature = cached_dataset(config['test_data_path'], 'testdata', config)
+    
+    data_key = (os.path.abspath(config['test_data_path']), signature)
+    with _score_cache_lock:
+        data_hash = _data_hashes.get(data_key)
+    if data_hash is None:
+        data_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+        with _score_cache_lock:
+            _data_hashes[data_key] = data_hash
+    
+    key = (model_hash, data_hash)
+    with _score_cache_lock:
+        cached = key in _score_cache
+        if cached:
+            _score_cache.move_to_end(key)
+            f1 = _score_cache[key]
+    
+    if not cached:
+        f1 = f1_on(model, df)
+        logger.info(f"F1 score of deployed model {model_hash[:12]} on test data {data_hash[:12]}: {f1:.4f}")
+        with _score_cache_lock:
+            _score_cache[key] = f1
+            while len(_score_cache) > MAX_SCORES:
+                _score_cache.popitem(last=False)
+    
+    return {
+        'f1_score': f1,
+        'model_hash': model_hash,
+        'test_data_hash': data_hash,
+        'cached': cached
+    }
+
 if __name__ == '__main__':
     score_model()
 
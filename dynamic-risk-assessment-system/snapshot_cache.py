@@ -0,0 +1,100 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SnapshotCache:
+    """
+    Class to serve the last good result of expensive functions, refreshed in the background
+    
+    Each registered function has its own TTL. A request for a stale result gets
+    the previous snapshot at once and triggers a refresh on a worker thread.
+    Only the very first request for a result waits, and it waits for all missing
+    results concurrently. At most one refresh of a result runs at a time; later
+    requests share the one in flight. A failed refresh keeps the last good snapshot.
+    """
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='snapshot-refresh')
+        self._lock = threading.Lock()
+        self._entries = {}
+    
+    def register(self, name, func, ttl):
+        """
+        Function to add an expensive function whose result is cached for ttl seconds
+        """
+        with self._lock:
+            self._entries[name] = {
+                'func': func,
+                'ttl': ttl,
+                'value': None,
+                'computed_at': None,
+                'error': None,
+                'future': None
+            }
+    
+    def get(self, names=None):
+        """
+        Function to get the snapshots of the given (default all) results with their age in seconds
+        """
+        with self._lock:
+            names = list(self._entries) if names is None else names
+            missing = []
+            for name in names:
+                entry = self._entries[name]
+                stale = entry['computed_at'] is None or time.time() - entry['computed_at'] >= entry['ttl']
+                if stale:
+                    self._start_refresh(entry, name)
+                if entry['computed_at'] is None:
+                    missing.append(entry['future'])
+        
+        for future in missing:
+            future.result()
+        
+        snapshots = {}
+        with self._lock:
+            for name in names:
+                entry = self._entries[name]
+                age = time.time() - entry['computed_at'] if entry['computed_at'] is not None else None
+                snapshots[name] = {
+                    'value': entry['value'],
+                    'age_seconds': age,
+                    'refreshing': entry['future'] is not None,
+                    'error': entry['error']
+                }
+        return snapshots
+    
+    def refresh(self, names=None):
+        """
+        Function to recompute the given (default all) results now, in parallel, joining refreshes already running
+        """
+        with self._lock:
+            names = list(self._entries) if names is None else names
+            futures = [self._start_refresh(self._entries[name], name) for name in names]
+        for future in futures:
+            future.result()
+    
+    def _start_refresh(self, entry, name):
+        # Called with the lock held; the future is the in-flight flag, cleared when the refresh ends
+        if entry['future'] is None:
+            entry['future'] = self._executor.submit(self._refresh, name)
+        return entry['future']
+    
+    def _refresh(self, name):
+        entry = self._entries[name]
+        start_time = time.time()
+        try:
+            value = entry['func']()
+            with self._lock:
+                entry.update(value=value, computed_at=time.time(), error=None)
+            logger.info(f"Refreshed {name} in {time.time() - start_time:.2f} seconds")
+        except Exception as e:
+            logger.error(f"Refreshing {name} failed, keeping the last snapshot: {str(e)}")
+            with self._lock:
+                entry['error'] = str(e)
+        finally:
+            with self._lock:
+                entry['future'] = None
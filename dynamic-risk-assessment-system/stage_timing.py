@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import inspect
+import resource
+import functools
+import threading
+import statistics
+from collections import deque
+from datetime import datetime
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Records kept in the history file; older ones are dropped when it grows to twice this
+MAX_HISTORY = 1000
+
+_active = threading.local()
+_history_cache = {}
+_history_lock = threading.Lock()
+
+def history_path(config=None):
+    """
+    Function to get the path of the timing history file
+    """
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    return config.get('timing_history_path', 'timing_history.jsonl')
+
+def peak_memory_mb():
+    """
+    Function to get the peak resident memory of this process in MB
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    # Lifetime peak of the process, in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def cpu_seconds():
+    """
+    Function to get the CPU time used by this process and its finished child processes
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def record_stage(record, config=None):
+    """
+    Function to append a stage timing record to the history file
+    """
+    path = history_path(config)
+    with _history_lock:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        
+        # Records are about the same length, so the size tells when the file may be over the limit
+        if os.path.getsize(path) > 2 * MAX_HISTORY * len(json.dumps(record)):
+            with open(path, 'r') as f:
+                lines = f.readlines()
+            if len(lines) > 2 * MAX_HISTORY:
+                with open(path + '.tmp', 'w') as f:
+                    f.writelines(lines[-MAX_HISTORY:])
+                os.replace(path + '.tmp', path)
+
+def timed_stage(stage):
+    """
+    Decorator to record the wall time, CPU time and peak memory of each run of a pipeline stage
+    
+    Records share the run id in the PIPELINE_RUN_ID environment variable, which
+    fullprocess.py sets for all stages of one pipeline run. They go to the
+    history file of the config the stage was called with, if any.
+    
+    Peak memory is the high-water mark of the whole process, which is never
+    reset, as that would corrupt the peaks of stages running concurrently in
+    other threads. peak_memory_growth_mb is how far the stage raised it; a
+    stage that stays under an earlier peak shows no growth, and concurrent
+    stages may both be charged for the same growth. Stage scripts run as
+    subprocesses have a process of their own, so there the peak is the stage's.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Recursive calls belong to the outer run of the stage
+            active = getattr(_active, 'stages', set())
+            if stage in active:
+                return func(*args, **kwargs)
+            _active.stages = active | {stage}
+            
+            started_at = datetime.now().isoformat(timespec='seconds')
+            start_peak = peak_memory_mb()
+            start_wall = time.perf_counter()
+            start_cpu = cpu_seconds()
+            status = 'error'
+            try:
+                result = func(*args, **kwargs)
+                status = 'ok'
+                return result
+            finally:
+                _active.stages = active
+                peak = peak_memory_mb()
+                record = {
+                    'run_id': os.environ.get('PIPELINE_RUN_ID'),
+                    'stage': stage,
+                    'started_at': started_at,
+                    'status': status,
+                    'wall_seconds': time.perf_counter() - start_wall,
+                    'cpu_seconds': cpu_seconds() - start_cpu,
+                    'peak_memory_mb': peak,
+                    'peak_memory_growth_mb': max(peak - start_peak, 0.0)
+                }
+                try:
+                    record_stage(record, signature.bind_partial(*args, **kwargs).arguments.get('config'))
+                except OSError as e:
+                    logger.warning(f"Could not record timing of stage {stage}: {str(e)}")
+        return wrapper
+    return decorator
+
+def load_timing_history(config=None):
+    """
+    Function to load the timing history, cached until the file changes
+    """
+    path = history_path(config)
+    if not os.path.exists(path):
+        return []
+    
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    with _history_lock:
+        if _history_cache.get(path, {}).get('signature') == signature:
+            return _history_cache[path]['records']
+        
+        records = deque(maxlen=MAX_HISTORY)
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short by a crash
+                    continue
+        _history_cache[path] = {'signature': signature, 'records': list(records)}
+        return _history_cache[path]['records']
+
+def timing_trends(window=10, config=None):
+    """
+    Function to get the latest timing of each stage with its trend over recent successful runs
+    
+    The trend is the latest wall time divided by the median of the previous
+    runs in the window, so values above 1 mean the stage got slower.
+    """
+    runs = {}
+    for record in load_timing_history(config):
+        if record['status'] == 'ok':
+            runs.setdefault(record['stage'], []).append(record)
+    
+    trends = {}
+    for stage, records in runs.items():
+        latest = records[-1]
+        previous = [r['wall_seconds'] for r in records[-window - 1:-1]]
+        baseline = statistics.median(previous) if previous else None
+        trends[stage] = {
+            'latest': latest,
+            'runs': len(records),
+            'median_wall_seconds': baseline,
+            'wall_trend': latest['wall_seconds'] / baseline if baseline else None
+        }
+    return trends
@@ -8,6 +8,7 @@ import sys
 import json
 import pandas as pd
 import subprocess
+import tempfile
 import logging
 
 # Set up logging
@@ -25,6 +26,128 @@ def test_data_ingestion():
         logger.error(f"✗ Data ingestion test failed: {result.stderr}")
         return False
 
+def test_incremental_ingestion():
+    """Test that re-running ingestion without new files leaves the final dataset unchanged"""
+    logger.info("Testing incremental ingestion...")
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    final_data_path = os.path.join(config['output_folder_path'], 'finaldata.csv')
+    
+    subprocess.run([sys.executable, 'ingestion.py'], capture_output=True, text=True)
+    with open(final_data_path, 'rb') as f:
+        before = f.read()
+    
+    result = subprocess.run([sys.executable, 'ingestion.py'], capture_output=True, text=True)
+    with open(final_data_path, 'rb') as f:
+        after = f.read()
+    
+    if result.returncode == 0 and before == after and 'up to date' in result.stderr:
+        logger.info("✓ Incremental ingestion test passed")
+        return True
+    else:
+        logger.error(f"✗ Incremental ingestion test failed: {result.stderr}")
+        return False
+
+def test_parallel_ingestion():
+    """Test that parallel reads return the same files in the same order as sequential reads"""
+    logger.info("Testing parallel ingestion...")
+    from ingestion import read_source_files
+    file_paths = [os.path.join('sourcedata', f) for f in sorted(os.listdir('sourcedata')) if f.endswith('.csv')]
+    
+    sequential = read_source_files(file_paths, [None] * len(file_paths), workers=1)
+    parallel = read_source_files(file_paths, [None] * len(file_paths), workers=4, executor='process')
+    
+    if all(a['signature'] == b['signature'] and a['df'].equals(b['df']) for a, b in zip(sequential, parallel)):
+        logger.info("✓ Parallel ingestion test passed")
+        return True
+    else:
+        logger.error("✗ Parallel ingestion test failed: results differ from sequential reads")
+        return False
+
+def test_streaming_ingestion():
+    """Test that chunked streaming ingestion builds the same final dataset as whole-file ingestion"""
+    logger.info("Testing streaming ingestion...")
+    from ingestion import merge_multiple_dataframe
+    from datastore import load_final_data
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    with tempfile.TemporaryDirectory() as folder:
+        # Timings of these runs go to the scratch history, not the one diagnostics report
+        config = dict(config, timing_history_path=os.path.join(folder, 'timing_history.jsonl'))
+        whole = dict(config, output_folder_path=os.path.join(folder, 'whole'), ingestion_chunk_rows=0)
+        streamed = dict(config, output_folder_path=os.path.join(folder, 'streamed'), ingestion_chunk_rows=2)
+        added_whole = merge_multiple_dataframe(full_refresh=True, config=whole)
+        added = merge_multiple_dataframe(full_refresh=True, config=streamed)
+        expected, actual = load_final_data(whole), load_final_data(streamed)
+        with open(config['timing_history_path'], 'r') as f:
+            timed = [json.loads(line)['stage'] for line in f]
+    
+    if added_whole == added == len(expected) and expected.equals(actual) and timed == ['ingestion', 'ingestion']:
+        logger.info(f"✓ Streaming ingestion test passed: {added} rows")
+        return True
+    else:
+        logger.error("✗ Streaming ingestion test failed: streamed dataset differs from whole-file ingestion")
+        return False
+
+def test_columnar_storage():
+    """Test that the typed columnar dataset matches the CSV export"""
+    logger.info("Testing columnar storage...")
+    from datastore import load_final_data
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    df = load_final_data(config)
+    csv_df = pd.read_csv(os.path.join(config['output_folder_path'], 'finaldata.csv'))
+    
+    if len(df) == len(csv_df) and (df.astype(str).values == csv_df.astype(str).values).all():
+        logger.info(f"✓ Columnar storage test passed: {dict(df.dtypes.astype(str))}")
+        return True
+    else:
+        logger.error("✗ Columnar storage test failed: dataset differs from the CSV export")
+        return False
+
+def test_parquet_freshness():
+    """Test that a replaced CSV is never answered from a stale parquet copy and that readers never write"""
+    logger.info("Testing parquet freshness...")
+    from concurrent.futures import ThreadPoolExecutor
+    from datastore import convert_dataset, load_final_data, read_dataset, write_dataset
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    df = load_final_data(config)
+    with tempfile.TemporaryDirectory() as folder:
+        write_dataset(df, folder, 'finaldata', config)
+        csv_path = os.path.join(folder, 'finaldata.csv')
+        old_mtime = os.stat(csv_path).st_mtime - 3600
+        
+        # Replace the CSV the way mv/cp -p do: different content, older mtime
+        changed = df.assign(exited=1 - df['exited'])
+        changed.to_csv(csv_path + '.new', index=False)
+        os.utime(csv_path + '.new', (old_mtime, old_mtime))
+        os.replace(csv_path + '.new', csv_path)
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            reads = list(pool.map(lambda _: read_dataset(folder, 'finaldata', config), range(8)))
+        leftovers = sorted(f for f in os.listdir(folder) if f.startswith('.'))
+        converted = convert_dataset(folder, 'finaldata', config)
+        after = read_dataset(folder, 'finaldata', config)
+        
+        # The copy must stay readable by other users, such as the web server
+        parquet_path = os.path.join(folder, 'finaldata.parquet')
+        readable = (os.stat(parquet_path).st_mode & 0o005 == 0o005
+                    and all(os.stat(os.path.join(parquet_path, f)).st_mode & 0o004 for f in os.listdir(parquet_path)))
+        leftovers += sorted(f for f in os.listdir(parquet_path) if f.startswith('.'))
+    
+    if (all(read['exited'].equals(changed['exited']) for read in reads) and not leftovers
+            and converted and after['exited'].equals(changed['exited']) and readable):
+        logger.info("✓ Parquet freshness test passed")
+        return True
+    else:
+        logger.error(f"✗ Parquet freshness test failed: leftovers={leftovers}, converted={converted}, "
+                     f"readable={readable}")
+        return False
+
 def test_model_training():
     """Test model training functionality"""
     logger.info("Testing model training...")
@@ -69,6 +192,587 @@ def test_diagnostics():
         logger.error(f"✗ Diagnostics test failed: {result.stderr}")
         return False
 
+def test_diagnostics_snapshots():
+    """Test that diagnostics are computed concurrently, then served from snapshots refreshed in the background"""
+    logger.info("Testing diagnostics snapshots...")
+    import time
+    from snapshot_cache import SnapshotCache
+    
+    calls = []
+    def slow(name):
+        def compute():
+            time.sleep(0.3)
+            calls.append(name)
+            if name == 'failing' and len(calls) > 3:
+                raise RuntimeError("refresh failed")
+            return len(calls)
+        return compute
+    
+    cache = SnapshotCache()
+    for name in ['a', 'b', 'failing']:
+        cache.register(name, slow(name), ttl=0.5)
+    
+    start_time = time.time()
+    first = cache.get()
+    first_time = time.time() - start_time
+    
+    time.sleep(0.6)
+    start_time = time.time()
+    stale = cache.get()
+    stale_time = time.time() - start_time
+    time.sleep(0.5)
+    refreshed = cache.get()
+    
+    # Concurrent requests for a stale snapshot, and an explicit refresh, share one refresh
+    import threading
+    time.sleep(0.6)
+    calls_before = calls.count('a')
+    readers = [threading.Thread(target=cache.get, args=(['a'],)) for _ in range(8)]
+    for reader in readers:
+        reader.start()
+    cache.refresh(['a'])
+    for reader in readers:
+        reader.join()
+    overlapping = calls.count('a') - calls_before
+    
+    if (first_time < 0.6 and stale_time < 0.1 and stale['a']['value'] == first['a']['value']
+            and stale['a']['age_seconds'] >= 0.5 and refreshed['a']['value'] != first['a']['value']
+            and refreshed['failing']['error'] and refreshed['failing']['value'] == first['failing']['value']
+            and overlapping == 1):
+        logger.info(f"✓ Diagnostics snapshots test passed: first call {first_time:.2f}s, stale call {stale_time * 1000:.1f} ms")
+        return True
+    else:
+        logger.error(f"✗ Diagnostics snapshots test failed: {first}, {stale}, {refreshed}, overlapping={overlapping}")
+        return False
+
+def test_dependency_audit():
+    """Test that the dependency audit works offline from a local index snapshot and is cached"""
+    logger.info("Testing dependency audit...")
+    import time
+    from diagnostics import outdated_packages_list
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    with tempfile.TemporaryDirectory() as folder:
+        config = dict(config,
+                      package_index_snapshot=os.path.join(folder, 'package_index.json'),
+                      dependency_cache_path=os.path.join(folder, 'dependency_audit.json'))
+        with open(config['package_index_snapshot'], 'w') as f:
+            # Versions that are not PEP 440, like a git snapshot, are skipped
+            json.dump({'packages': {'pandas': ['1.5.3', '99.0.0', 'nightly-2024'], 'numpy': '1.24.3',
+                                    'flask': 'git+abc123'}}, f)
+        
+        start_time = time.time()
+        packages = {pkg['package']: pkg for pkg in outdated_packages_list(config)}
+        elapsed = time.time() - start_time
+        cached = os.path.exists(config['dependency_cache_path'])
+        leftovers = [f for f in os.listdir(folder) if f.startswith('.')]
+    
+    # Without packaging, a version with no numeric part is invalid rather than 0
+    from unittest import mock
+    from diagnostics import parse_version
+    with mock.patch.dict(sys.modules, {'packaging.version': None}):
+        fallback = [parse_version('Unknown'), parse_version('1.24.3'), parse_version('2.0rc1')]
+    
+    if (elapsed < 1 and cached and not leftovers and packages['pandas']['outdated'] is True
+            and packages['numpy']['outdated'] is False and packages['flask']['latest_version'] == 'Unknown'
+            and packages['flask']['outdated'] is None and fallback == [None, (1, 24, 3), (2, 0)]):
+        logger.info(f"✓ Dependency audit test passed in {elapsed * 1000:.1f} ms")
+        return True
+    else:
+        logger.error(f"✗ Dependency audit test failed: {packages}, leftovers={leftovers}, fallback={fallback}")
+        return False
+
+def test_stage_timing():
+    """Test that pipeline stages record their timings and diagnostics serve them without re-running"""
+    logger.info("Testing stage timing...")
+    import time
+    from diagnostics import execution_time
+    from stage_timing import timing_trends
+    
+    start_time = time.time()
+    timing = execution_time()
+    elapsed = time.time() - start_time
+    trends = timing_trends()
+    
+    stages = ['ingestion', 'training', 'scoring', 'deployment']
+    fields = ['wall_seconds', 'cpu_seconds', 'peak_memory_mb', 'peak_memory_growth_mb']
+    if (None not in timing and elapsed < 1 and all(stage in trends for stage in stages)
+            and all(field in trends[stage]['latest'] for stage in stages for field in fields)):
+        logger.info(f"✓ Stage timing test passed: {timing} in {elapsed * 1000:.1f} ms")
+        return True
+    else:
+        logger.error(f"✗ Stage timing test failed: {timing}, {list(trends)}")
+        return False
+
+def test_dataset_statistics():
+    """Test that cached statistics match pandas and are recomputed when the dataset changes"""
+    logger.info("Testing dataset statistics...")
+    import shutil
+    from datastore import append_dataset, load_final_data, write_dataset
+    from diagnostics import dataset_statistics
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    df = load_final_data(config)
+    with tempfile.TemporaryDirectory() as folder:
+        config = dict(config, output_folder_path=folder)
+        write_dataset(df, folder, 'finaldata', config)
+        first = dataset_statistics(config)
+        cached = dataset_statistics(config)
+        append_dataset(df.head(3), folder, 'finaldata', config)
+        updated = dataset_statistics(config)
+        
+        # A copy in another folder has the same file signature but must not share the cached statistics
+        with tempfile.TemporaryDirectory() as other_folder:
+            shutil.copytree(folder, other_folder, copy_function=shutil.copy2, dirs_exist_ok=True)
+            separate = dataset_statistics(dict(config, output_folder_path=other_folder))
+    
+    expected = df.drop(columns=['corporation', 'exited']).mean()
+    means = {stats['column']: stats['mean'] for stats in first['summary']}
+    if (cached is first and updated is not first and separate is not updated
+            and all(abs(means[col] - expected[col]) < 1e-9 for col in expected.index)):
+        logger.info("✓ Dataset statistics test passed")
+        return True
+    else:
+        logger.error(f"✗ Dataset statistics test failed: {first}")
+        return False
+
+def test_model_cache():
+    """Test that the deployed model is loaded once and reloaded only when its content changes"""
+    logger.info("Testing model cache...")
+    import pickle
+    import shutil
+    from diagnostics import load_deployed_model, model_cache_stats
+    
+    with tempfile.TemporaryDirectory() as folder:
+        model_path = os.path.join(folder, 'trainedmodel.pkl')
+        shutil.copy2('production_deployment/trainedmodel.pkl', model_path)
+        first = load_deployed_model(model_path)
+        same = load_deployed_model(model_path)
+        os.utime(model_path)
+        touched = load_deployed_model(model_path)
+        loads_before = model_cache_stats()['loads']
+        
+        # Publish a different model the way deployment.py does
+        first.C = first.C * 2
+        with open(model_path + '.tmp', 'wb') as f:
+            pickle.dump(first, f)
+        os.replace(model_path + '.tmp', model_path)
+        reloaded = load_deployed_model(model_path)
+        stats = model_cache_stats()
+    
+    if same is first and touched is first and reloaded is not first and stats['loads'] == loads_before + 1:
+        logger.info(f"✓ Model cache test passed: {stats['loads']} loads, {stats['hits']} hits")
+        return True
+    else:
+        logger.error(f"✗ Model cache test failed: {stats}")
+        return False
+
+def test_scoring_memo():
+    """Test that scoring the deployed model is memoized on the model and test data hashes"""
+    logger.info("Testing scoring memoization...")
+    import pickle
+    import shutil
+    from scoring import score_deployed_model
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    with tempfile.TemporaryDirectory() as folder:
+        config = dict(config, prod_deployment_path=folder)
+        shutil.copy2('production_deployment/trainedmodel.pkl', os.path.join(folder, 'trainedmodel.pkl'))
+        first = score_deployed_model(config)
+        second = score_deployed_model(config)
+        
+        # Deploy a different model
+        with open(os.path.join(folder, 'trainedmodel.pkl'), 'rb') as f:
+            model = pickle.load(f)
+        model.C = model.C / 1000
+        with open(os.path.join(folder, 'trainedmodel.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+        third = score_deployed_model(config)
+        written = os.listdir(folder)
+    
+    if (second['cached'] and second['f1_score'] == first['f1_score'] and not third['cached']
+            and third['model_hash'] != first['model_hash'] and written == ['trainedmodel.pkl']):
+        logger.info(f"✓ Scoring memoization test passed: {first['f1_score']:.4f}, {third['f1_score']:.4f}")
+        return True
+    else:
+        logger.error(f"✗ Scoring memoization test failed: {first}, {second}, {third}")
+        return False
+
+def test_prediction_modes():
+    """Test that file path, inline records and streamed CSV uploads give the same predictions"""
+    logger.info("Testing prediction modes...")
+    import io
+    import app as api
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    test_file = os.path.join(config['test_data_path'], 'testdata.csv')
+    with open(test_file, 'rb') as f:
+        csv_bytes = f.read()
+    
+    client = api.app.test_client()
+    state = api.app.extensions['risk_assessment']
+    chunk_rows = state['prediction_chunk_rows']
+    state['prediction_chunk_rows'] = 2
+    try:
+        by_path = client.post('/prediction', json={'filepath': test_file}).get_json()
+        by_records = client.post('/prediction', json={'records': pd.read_csv(test_file).to_dict('records')}).get_json()
+        by_body = json.loads(client.post('/prediction', data=csv_bytes, content_type='text/csv').get_data())
+        by_upload = json.loads(client.post('/prediction', data={'file': (io.BytesIO(csv_bytes), 'testdata.csv')},
+                                           content_type='multipart/form-data').get_data())
+        bad_records = client.post('/prediction', json={'records': [{'lastmonth_activity': 1}]}).status_code
+        # A bad header is found in the first chunk, before the streamed response starts
+        bad_upload = client.post('/prediction', data=b'a,b\n1,2\n', content_type='text/csv')
+    finally:
+        state['prediction_chunk_rows'] = chunk_rows
+    
+    # Without a deployed model every mode answers 503
+    with tempfile.TemporaryDirectory() as folder:
+        undeployed = api.create_app(dict(config, prod_deployment_path=folder), preload_state=False).test_client()
+        no_model = [
+            undeployed.post('/prediction', json={'filepath': test_file}).status_code,
+            undeployed.post('/prediction', json={'records': [{'lastmonth_activity': 1}]}).status_code,
+            undeployed.post('/prediction', data=csv_bytes, content_type='text/csv').status_code
+        ]
+    
+    expected = by_path['predictions']
+    if (len(expected) == len(csv_bytes.splitlines()) - 1 and by_records['predictions'] == expected
+            and by_body['predictions'] == expected and by_upload['predictions'] == expected
+            and bad_records == 400 and bad_upload.status_code == 400 and 'error' in bad_upload.get_json()
+            and no_model == [503, 503, 503]):
+        logger.info(f"✓ Prediction modes test passed: {len(expected)} predictions")
+        return True
+    else:
+        logger.error(f"✗ Prediction modes test failed: {by_path}, {by_records}, {by_body}, {by_upload}, {no_model}")
+        return False
+
+def test_prediction_cache():
+    """Test that file predictions are cached on the file and model content hashes, with LRU eviction"""
+    logger.info("Testing prediction cache...")
+    import pickle
+    import shutil
+    from diagnostics import predict_file, prediction_cache_stats
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    test_df = pd.read_csv(os.path.join(config['test_data_path'], 'testdata.csv'))
+    
+    with tempfile.TemporaryDirectory() as folder:
+        config = dict(config, prod_deployment_path=folder, prediction_cache_rows=2 * len(test_df))
+        shutil.copy2('production_deployment/trainedmodel.pkl', os.path.join(folder, 'trainedmodel.pkl'))
+        paths = [os.path.join(folder, f'input{i}.csv') for i in range(3)]
+        for i, path in enumerate(paths):
+            test_df.assign(lastmonth_activity=test_df['lastmonth_activity'] + i + 1).to_csv(path, index=False)
+        
+        before = prediction_cache_stats()
+        first, first_cached = predict_file(paths[0], config)
+        second, second_cached = predict_file(paths[0], config)
+        
+        # Filling the cache past its size evicts the least recently used file
+        predict_file(paths[1], config)
+        predict_file(paths[2], config)
+        _, evicted_cached = predict_file(paths[0], config)
+        
+        # Deploy a different model
+        with open(os.path.join(folder, 'trainedmodel.pkl'), 'rb') as f:
+            model = pickle.load(f)
+        model.C = model.C / 1000
+        with open(os.path.join(folder, 'trainedmodel.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+        _, new_model_cached = predict_file(paths[0], config)
+        after = prediction_cache_stats()
+        
+        # A file replaced after the cache lookup is cached under the hash of the bytes that were parsed
+        from unittest import mock
+        import diagnostics
+        read_file_version = diagnostics.read_file_version
+        def replaced_then_read(file_path):
+            shutil.copy2(paths[2], file_path + '.new')
+            os.replace(file_path + '.new', file_path)
+            return read_file_version(file_path)
+        with mock.patch.object(diagnostics, 'read_file_version', replaced_then_read):
+            raced, _ = predict_file(paths[1], config)
+        replaced, replaced_cached = predict_file(paths[2], config)
+    
+    if (not first_cached and second_cached and second == first and not evicted_cached and not new_model_cached
+            and after['hits'] - before['hits'] == 1 and after['evictions'] > before['evictions']
+            and after['hit_rate'] is not None and replaced_cached and replaced == raced):
+        logger.info(f"✓ Prediction cache test passed: {after}")
+        return True
+    else:
+        logger.error(f"✗ Prediction cache test failed: {before}, {after}")
+        return False
+
+def test_app_factory():
+    """Test that the application factory preloads the serving state and serves concurrent requests"""
+    logger.info("Testing application factory...")
+    from concurrent.futures import ThreadPoolExecutor
+    from app import create_app
+    from datastore import load_final_data, write_dataset
+    from diagnostics import model_cache_stats
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    test_file = os.path.join(config['test_data_path'], 'testdata.csv')
+    
+    first = create_app(config)
+    second = create_app(config, preload_state=False)
+    model_path = os.path.join(config['prod_deployment_path'], 'trainedmodel.pkl')
+    preloaded = model_path in model_cache_stats()['models']
+    
+    client = first.test_client()
+    def call(_):
+        summary = client.get('/summarystats')
+        prediction = client.post('/prediction', json={'filepath': test_file})
+        return summary.status_code, prediction.status_code, prediction.get_json()['predictions']
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(call, range(32)))
+    
+    # Diagnostics of an app built with another config describe that config's dataset and timings
+    with tempfile.TemporaryDirectory() as folder:
+        other = dict(config, output_folder_path=folder,
+                     timing_history_path=os.path.join(folder, 'timing_history.jsonl'),
+                     dependency_cache_path=os.path.join(folder, 'dependency_audit.json'))
+        df = load_final_data(config).astype({'lastmonth_activity': 'float64'})
+        df.loc[:1, 'lastmonth_activity'] = None
+        write_dataset(df, folder, 'finaldata', other)
+        other_diagnostics = create_app(other, preload_state=False).test_client().get('/diagnostics').get_json()
+    
+    separate = (first.extensions['risk_assessment']['diagnostics_cache']
+                is not second.extensions['risk_assessment']['diagnostics_cache'])
+    if (preloaded and separate and all(r[:2] == (200, 200) for r in results)
+            and all(r[2] == results[0][2] for r in results)
+            and other_diagnostics['missing_data_percentages'] == list(df.isna().mean() * 100)
+            and other_diagnostics['execution_times'] == [None, None]):
+        logger.info(f"✓ Application factory test passed: {len(results)} concurrent request pairs")
+        return True
+    else:
+        logger.error(f"✗ Application factory test failed: preloaded={preloaded}, {results[:3]}")
+        return False
+
+def test_pipeline_dag():
+    """Test that the in-process pipeline runs stages in dependency order and skips those after a stop"""
+    logger.info("Testing pipeline DAG...")
+    from fullprocess import run_dag, in_process_stages
+    
+    calls = []
+    def stage(name, result):
+        def run(*inputs):
+            calls.append((name, inputs))
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return run
+    
+    results, timings = run_dag({
+        'report': (stage('report', 'report.pdf'), ['train', 'data']),
+        'train': (stage('train', 'model'), ['data']),
+        'data': (stage('data', 'df'), []),
+        'gate': (stage('gate', False), ['data']),
+        'gated': (stage('gated', True), ['gate']),
+        'broken': (stage('broken', RuntimeError('boom')), ['data']),
+        'after_broken': (stage('after_broken', True), ['broken'])
+    })
+    order = [name for name, _ in calls]
+    
+    # A deployment without a trained model stops the run before reporting
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    with tempfile.TemporaryDirectory() as folder:
+        stages = in_process_stages(dict(config, output_model_path=folder,
+                                        prod_deployment_path=os.path.join(folder, 'production_deployment'),
+                                        timing_history_path=os.path.join(folder, 'timing_history.jsonl')))
+        undeployed, _ = run_dag({
+            'scoring': (stage('scoring', True), []),
+            'deployment': (stages['deployment'][0], ['scoring']),
+            'reporting': (stages['reporting'][0], ['deployment'])
+        })
+    
+    if (dict(calls)['report'] == ('model', 'df') and order.index('data') < order.index('train') < order.index('report')
+            and 'gated' not in results and results['broken'] is False and 'after_broken' not in results
+            and set(timings) == set(results) and undeployed['deployment'] is False and 'reporting' not in undeployed):
+        logger.info(f"✓ Pipeline DAG test passed: {order}")
+        return True
+    else:
+        logger.error(f"✗ Pipeline DAG test failed: {calls}, {results}")
+        return False
+
+def test_drift_gate():
+    """Test that retraining is gated on feature drift, label shift and performance decay of new rows"""
+    logger.info("Testing drift gate...")
+    import shutil
+    import numpy as np
+    from drift import drift_report, check_drift, save_reference_data, REFERENCE_FILE, REFERENCE_META_FILE
+    from ingestion import MANIFEST_FILE
+    from datastore import load_final_data
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    
+    rng = np.random.default_rng(0)
+    def sample(rows, scale=1.0, exited_rate=0.3):
+        return pd.DataFrame({
+            'corporation': [f'c{i}' for i in range(rows)],
+            'lastmonth_activity': (rng.exponential(200, rows) * scale).astype('int64'),
+            'lastyear_activity': (rng.exponential(2000, rows) * scale).astype('int64'),
+            'number_of_employees': (rng.exponential(100, rows) * scale).astype('int64'),
+            'exited': (rng.random(rows) < exited_rate).astype('int64')
+        })
+    reference = sample(2000)
+    stable = drift_report(reference, sample(500))
+    shifted = drift_report(reference, sample(500, scale=3.0))
+    relabelled = drift_report(reference, sample(500, exited_rate=0.7))
+    too_few = drift_report(reference, sample(3, scale=3.0))
+    
+    # New rows are the rows appended to the final dataset after those the deployed model was trained on
+    with tempfile.TemporaryDirectory() as folder:
+        config = dict(config, prod_deployment_path=folder, output_folder_path=folder)
+        shutil.copy2('production_deployment/trainedmodel.pkl', os.path.join(folder, 'trainedmodel.pkl'))
+        reference.to_csv(os.path.join(folder, REFERENCE_FILE), index=False)
+        with open(os.path.join(folder, REFERENCE_META_FILE), 'w') as f:
+            json.dump({'rows': len(reference), 'dataset_id': 'a'}, f)
+        def set_dataset_id(dataset_id):
+            with open(os.path.join(folder, MANIFEST_FILE), 'w') as f:
+                json.dump({'dataset_id': dataset_id}, f)
+        final_df = pd.concat([reference, sample(500, scale=3.0)], ignore_index=True)
+        set_dataset_id('a')
+        checked = check_drift(final_df, config)
+        set_dataset_id('b')
+        rebuilt = check_drift(final_df, config)
+    
+    # The released reference is a bounded sample of the training data
+    with tempfile.TemporaryDirectory() as folder:
+        with open('config.json', 'r') as f:
+            config = dict(json.load(f), drift_reference_rows=5)
+        save_reference_data(os.path.join(folder, REFERENCE_FILE), os.path.join(folder, REFERENCE_META_FILE), config)
+        saved = pd.read_csv(os.path.join(folder, REFERENCE_FILE))
+        with open(os.path.join(folder, REFERENCE_META_FILE), 'r') as f:
+            saved_meta = json.load(f)
+    
+    if (not stable['retrain'] and shifted['retrain'] and all(f['psi'] > 0.25 for f in shifted['features'].values())
+            and relabelled['retrain'] and any('label' in reason for reason in relabelled['reasons'])
+            and not any('label' in reason for reason in shifted['reasons'])
+            and not too_few['retrain'] and checked['new_rows'] == 500 and checked['retrain']
+            and 'performance' in checked and rebuilt['retrain'] and 'new_rows' not in rebuilt
+            and len(saved) == 5 and saved_meta['rows'] == len(load_final_data())):
+        logger.info(f"✓ Drift gate test passed: {shifted['reasons']}")
+        return True
+    else:
+        logger.error(f"✗ Drift gate test failed: {stable}, {shifted}, {relabelled}, {too_few}, {checked}, {rebuilt}, "
+                     f"{saved_meta}")
+        return False
+
+def test_pipeline_watcher():
+    """Test that the watcher runs once per burst of new files and that pipeline runs cannot overlap"""
+    logger.info("Testing pipeline watcher...")
+    import time
+    import shutil
+    import threading
+    from fullprocess import watch_source_folder, pipeline_lock
+    
+    with tempfile.TemporaryDirectory() as folder:
+        runs = []
+        stop = threading.Event()
+        watcher = threading.Thread(target=lambda: runs.append(
+            watch_source_folder(folder, lambda: runs.append(len(os.listdir(folder))), 0.02, 0.3, stop)))
+        watcher.start()
+        time.sleep(0.5)
+        
+        # A burst of arrivals, each within the debounce window of the previous one
+        for i in range(3):
+            pd.DataFrame({'exited': [i]}).to_csv(os.path.join(folder, f'dataset{i}.csv'), index=False)
+            time.sleep(0.1)
+        time.sleep(0.6)
+        stop.set()
+        watcher.join()
+        
+        lock_path = os.path.join(folder, 'fullprocess.lock')
+        with pipeline_lock(lock_path) as first:
+            with pipeline_lock(lock_path) as second:
+                pass
+        with pipeline_lock(lock_path) as after_release:
+            pass
+        
+        # A run skipped while the lock is busy is retried without further changes
+        attempts = []
+        stop = threading.Event()
+        def busy_once():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                return False
+            stop.set()
+        retried = watch_source_folder(folder, busy_once, 0.02, 0, stop)
+    
+    # The gate sees the edited contents of an ingested file, not just new file names
+    from fullprocess import check_for_new_data
+    from ingestion import merge_multiple_dataframe
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    with tempfile.TemporaryDirectory() as folder:
+        config = dict(config, input_folder_path=os.path.join(folder, 'sourcedata'),
+                      output_folder_path=os.path.join(folder, 'ingesteddata'),
+                      timing_history_path=os.path.join(folder, 'timing_history.jsonl'))
+        os.makedirs(config['input_folder_path'])
+        source = os.path.join(config['input_folder_path'], 'dataset3.csv')
+        shutil.copy2(os.path.join('sourcedata', 'dataset3.csv'), source)
+        before_ingestion = check_for_new_data(config)
+        merge_multiple_dataframe(config=config)
+        ingested = check_for_new_data(config)
+        os.utime(source)
+        touched = check_for_new_data(config)
+        pd.read_csv(source).assign(exited=1).to_csv(source, index=False)
+        edited = check_for_new_data(config)
+    gate = [before_ingestion, ingested, touched, edited]
+    
+    # One run at start-up on the empty folder and one after the burst, then the run count
+    if (runs == [0, 3, 2] and first and not second and after_release and len(attempts) == 2 and retried == 1
+            and gate == [True, False, False, True]):
+        logger.info("✓ Pipeline watcher test passed")
+        return True
+    else:
+        logger.error(f"✗ Pipeline watcher test failed: runs={runs}, locks={first, second, after_release}, "
+                     f"attempts={len(attempts)}, gate={gate}")
+        return False
+
+def test_release_store():
+    """Test that deployments are content-addressed releases behind an atomically switched pointer"""
+    logger.info("Testing release store...")
+    from release_store import publish_release, rollback_release, BLOBS_DIR
+    
+    with tempfile.TemporaryDirectory() as folder:
+        store = os.path.join(folder, 'production_deployment')
+        os.makedirs(store)
+        def write(name, content):
+            path = os.path.join(folder, name)
+            with open(path, 'w') as f:
+                f.write(content)
+            return path
+        def deployed(name):
+            with open(os.path.join(store, name), 'r') as f:
+                return f.read()
+        
+        # A deployment folder in the earlier copy-in-place layout
+        write(os.path.join('production_deployment', 'latestscore.txt'), '0.5')
+        
+        model = write('trainedmodel.pkl', 'model v1')
+        first = publish_release(store, {'trainedmodel.pkl': model, 'latestscore.txt': write('latestscore.txt', '0.6')})
+        same = publish_release(store, {'trainedmodel.pkl': model, 'latestscore.txt': write('latestscore.txt', '0.6')})
+        blobs_before = len(os.listdir(os.path.join(store, BLOBS_DIR)))
+        second = publish_release(store, {'trainedmodel.pkl': model, 'latestscore.txt': write('latestscore.txt', '0.7')})
+        blobs_added = len(os.listdir(os.path.join(store, BLOBS_DIR))) - blobs_before
+        score_second = deployed('latestscore.txt')
+        
+        rolled_back = rollback_release(store)
+        score_rolled_back = deployed('latestscore.txt')
+        linked = os.path.islink(os.path.join(store, 'latestscore.txt'))
+    
+    if (same == first and second != first and blobs_added == 1 and score_second == '0.7'
+            and rolled_back == first and score_rolled_back == '0.6' and linked):
+        logger.info(f"✓ Release store test passed: {first} -> {second} -> {rolled_back}")
+        return True
+    else:
+        logger.error(f"✗ Release store test failed: {first}, {same}, {second}, {rolled_back}, {blobs_added}")
+        return False
+
 def test_reporting():
     """Test reporting functionality"""
     logger.info("Testing reporting...")
@@ -170,10 +874,28 @@ def main():
         ("File Structure", test_file_structure),
         ("Data Files", test_data_files),
         ("Data Ingestion", test_data_ingestion),
+        ("Incremental Ingestion", test_incremental_ingestion),
+        ("Parallel Ingestion", test_parallel_ingestion),
+        ("Streaming Ingestion", test_streaming_ingestion),
+        ("Columnar Storage", test_columnar_storage),
+        ("Parquet Freshness", test_parquet_freshness),
         ("Model Training", test_model_training),
         ("Model Scoring", test_model_scoring),
         ("Model Deployment", test_model_deployment),
+        ("Scoring Memoization", test_scoring_memo),
+        ("Prediction Modes", test_prediction_modes),
+        ("Prediction Cache", test_prediction_cache),
+        ("Application Factory", test_app_factory),
+        ("Pipeline DAG", test_pipeline_dag),
+        ("Pipeline Watcher", test_pipeline_watcher),
+        ("Drift Gate", test_drift_gate),
+        ("Release Store", test_release_store),
         ("Diagnostics", test_diagnostics),
+        ("Stage Timing", test_stage_timing),
+        ("Dependency Audit", test_dependency_audit),
+        ("Diagnostics Snapshots", test_diagnostics_snapshots),
+        ("Dataset Statistics", test_dataset_statistics),
+        ("Model Cache", test_model_cache),
         ("Reporting", test_reporting)
     ]
     
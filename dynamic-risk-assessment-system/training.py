@@ -4,6 +4,8 @@ import json
 import pickle
 import os
 import logging
+from stage_timing import timed_stage
+from datastore import load_final_data
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import f1_score
@@ -12,24 +14,28 @@ from sklearn.metrics import f1_score
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def train_model():
+@timed_stage('training')
+def train_model(df=None, config=None):
     """
     Function for training the model
+    
+    Trains on the given final dataset, or reads it when none is passed in.
     """
     # Load configuration
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    if config is None:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
     
-    output_folder_path = config['output_folder_path']
     output_model_path = config['output_model_path']
     
-    # Read finaldata.csv
-    final_data_path = os.path.join(output_folder_path, 'finaldata.csv')
-    if not os.path.exists(final_data_path):
-        logger.error(f"Final data file not found at {final_data_path}")
-        return
+    # Read the final dataset
+    if df is None:
+        try:
+            df = load_final_data(config)
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            return
     
-    df = pd.read_csv(final_data_path)
     logger.info(f"Loaded training data with shape: {df.shape}")
     
     # Prepare features and target
@@ -1,5 +1,6 @@
 from app import app
 
+# Production entry point, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`; `app` is built by app.create_app(),
+# which preloads the config, the deployed model and the datasets
 if __name__ == "__main__":
     app.run()
-
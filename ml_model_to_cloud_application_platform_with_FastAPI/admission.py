@@ -0,0 +1,116 @@
+"""
+Admission control for the Census Income Prediction API.
+
+Limits the number of predictions running at once and the number waiting for
+a slot. Requests beyond both limits are rejected immediately so the service
+sheds load instead of letting latency grow for every caller.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue.
+
+    Slots are handed directly from a finishing request to the oldest waiter,
+    so queued requests are served in arrival order.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 32,
+                 queue_timeout: Optional[float] = 5.0, retry_after: int = 1):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        """
+        Wait for a prediction slot.
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or the wait times out
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise AdmissionRejected("queue full", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.shed += 1
+            self.timed_out += 1
+            raise AdmissionRejected("queue wait timed out", self.retry_after)
+        except asyncio.CancelledError:
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; pass it on
+                self.release()
+            raise
+        self.admitted += 1
+
+    def release(self):
+        """Release a slot, handing it to the oldest live waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a prediction slot for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Current admission state.
+
+        Returns:
+            Dict[str, float]: Limits, in-flight and queued counts, and totals
+        """
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": sum(1 for waiter in self._waiters if not waiter.done()),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out
+        }
+
+    def _discard(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
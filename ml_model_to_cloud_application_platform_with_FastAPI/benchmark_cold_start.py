@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure API cold-start cost with and without the lean inference path.
+
+Each scenario runs in a fresh interpreter so module caches do not carry over:
+- full: import the scikit-learn CensusModel and unpickle model.pkl/encoders.pkl
+- lean: import the numpy-only CensusPredictor and load model.npz
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "full": (
+        "from model import CensusModel\n"
+        "m = CensusModel()\n"
+        "m.load_model('model/model.pkl', 'model/encoders.pkl')\n"
+    ),
+    "lean": (
+        "from inference import CensusPredictor\n"
+        "m = CensusPredictor.load('model/model.npz')\n"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "_start = time.perf_counter()\n"
+    "{body}"
+    "_loaded = time.perf_counter()\n"
+    "m.predict({sample})\n"
+    "print(_loaded - _start, time.perf_counter() - _loaded)\n"
+)
+
+SAMPLE_RECORD = {
+    "age": 45, "workclass": "Private", "fnlgt": 2334, "education": "Bachelors",
+    "education-num": 13, "marital-status": "Married-civ-spouse", "occupation": "Exec-managerial",
+    "relationship": "Husband", "race": "White", "sex": "Male", "capital-gain": 15000,
+    "capital-loss": 0, "hours-per-week": 40, "native-country": "United-States"
+}
+
+
+def run_scenario(name: str, runs: int):
+    """
+    Run one scenario repeatedly in fresh interpreters.
+
+    Args:
+        name (str): Scenario name
+        runs (int): Number of interpreter launches
+
+    Returns:
+        Tuple[List[float], List[float]]: Load times and first-prediction times
+    """
+    sample = f"[{SAMPLE_RECORD!r}]" if name == "lean" else f"__import__('pandas').DataFrame([{SAMPLE_RECORD!r}])"
+    code = TIMER.format(body=SCENARIOS[name], sample=sample)
+    load_times, predict_times = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        load_time, predict_time = map(float, result.stdout.split()[-2:])
+        load_times.append(load_time)
+        predict_times.append(predict_time)
+    return load_times, predict_times
+
+
+def main():
+    """Main benchmark function."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter launches per scenario")
+    args = parser.parse_args()
+
+    if not os.path.exists("model/model.npz"):
+        print("model/model.npz not found, run `python train_model.py` first")
+        sys.exit(1)
+
+    print(f"{'scenario':<10}{'import+load (s)':>18}{'first predict (s)':>20}")
+    for name in SCENARIOS:
+        load_times, predict_times = run_scenario(name, args.runs)
+        print(f"{name:<10}{statistics.median(load_times):>18.3f}{statistics.median(predict_times):>20.4f}")
+
+
+if __name__ == "__main__":
+    main()
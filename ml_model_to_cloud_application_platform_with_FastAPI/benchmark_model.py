@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the CensusModel hot paths with stored baselines.
+
+Each benchmark reports the best of several runs. Results are compared with
+benchmark_baseline.json and any benchmark slower than the baseline by more
+than the threshold is reported as a regression. By default a regression only
+warns; pass --fail-on-regression to exit non-zero (e.g. in CI).
+
+Usage:
+    python benchmark_model.py                       # compare against baseline
+    python benchmark_model.py --update-baseline     # record a new baseline
+    python benchmark_model.py --threshold 0.5 --fail-on-regression
+
+Baselines are machine specific: record them on the machine that runs the check.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+
+from model import CensusModel
+from inference import CensusPredictor
+
+BASELINE_PATH = "benchmark_baseline.json"
+DATA_PATH = "census.csv"
+BATCH_SIZES = [1, 100, 10000]
+
+
+def best_of(func, repeats: int, calibrate: bool = True) -> float:
+    """
+    Time a callable and return the fastest per-call time of several runs.
+
+    Fast functions are called in a loop sized with timeit's autorange so that
+    each run lasts at least 0.2 s, which keeps sub-millisecond timings stable.
+
+    Args:
+        func (callable): Function to time
+        repeats (int): Number of runs
+        calibrate (bool): Size the inner loop automatically; disable for slow functions
+
+    Returns:
+        float: Best time per call in seconds
+    """
+    timer = timeit.Timer(func)
+    number = timer.autorange()[0] if calibrate else 1
+    return min(timer.repeat(repeat=repeats, number=number)) / number
+
+
+def run_benchmarks(repeats: int) -> dict:
+    """
+    Run every benchmark.
+
+    Args:
+        repeats (int): Runs per benchmark (training runs once)
+
+    Returns:
+        dict: Benchmark name to best time in seconds
+    """
+    results = {}
+    model = CensusModel()
+
+    results["load_data"] = best_of(lambda: model.load_data(DATA_PATH), repeats)
+    df = model.load_data(DATA_PATH)
+
+    results["preprocess_data"] = best_of(lambda: CensusModel().preprocess_data(df.copy()), repeats)
+    X, y = model.preprocess_data(df.copy())
+
+    results["train"] = best_of(lambda: model.train(X, y), 1, calibrate=False)
+
+    features = df.drop("income", axis=1)
+    predictor = CensusPredictor.from_census_model(model)
+    for size in BATCH_SIZES:
+        batch = features.sample(n=size, replace=size > len(features), random_state=42)
+        records = batch.to_dict("records")
+        results[f"predict_{size}"] = best_of(lambda: model.predict(batch), repeats)
+        results[f"predictor_predict_{size}"] = best_of(lambda: predictor.predict(records), repeats)
+
+    results["get_slice_performance"] = best_of(lambda: model.get_slice_performance(df.copy(), "education"), repeats)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare results with the baseline and print a report.
+
+    Args:
+        results (dict): Current benchmark times
+        baseline (dict): Baseline benchmark times
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: Names of regressed benchmarks
+    """
+    regressions = []
+    print(f"{'benchmark':<28}{'current (s)':>14}{'baseline (s)':>14}{'ratio':>9}  status")
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<28}{current:>14.4f}{'-':>14}{'-':>9}  new")
+            continue
+        ratio = current / reference if reference > 0 else float("inf")
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(f"{name:<28}{current:>14.4f}{reference:>14.4f}{ratio:>9.2f}  {status}")
+    return regressions
+
+
+def main():
+    """Main benchmark function."""
+    parser = argparse.ArgumentParser(description="CensusModel micro-benchmarks")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per benchmark; the best is kept")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCHMARK_THRESHOLD", "0.3")),
+                        help="Allowed relative slowdown before a benchmark counts as a regression")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeats)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results
+            }, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        for name, seconds in results.items():
+            print(f"  {name}: {seconds:.4f}s")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline first")
+        sys.exit(1)
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nWARNING: {len(regressions)} benchmark(s) regressed by more than "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Streaming feature-drift monitoring for the Census Income Prediction API.
+
+Live traffic is summarised in fixed-size sketches whose bins are taken from a
+reference computed once on the training data: a frequency table per
+categorical feature and a quantile histogram per numeric feature. Updating a
+sketch is a single bin increment, so memory stays constant no matter how
+many requests are observed, and raw requests are never stored.
+"""
+
+import json
+import math
+import os
+import threading
+from bisect import bisect_right
+from typing import Dict, List
+
+import numpy as np
+
+
+CATEGORICAL_FEATURES = [
+    'workclass', 'education', 'marital-status', 'occupation',
+    'relationship', 'race', 'sex', 'native-country'
+]
+NUMERIC_FEATURES = [
+    'age', 'fnlgt', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week'
+]
+
+# Conventional PSI bands: below 0.1 is stable, above 0.25 is a significant shift
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+_EPSILON = 1e-4
+
+
+def build_reference(df, n_bins: int = 10) -> Dict[str, Dict]:
+    """
+    Build reference sketches from the training data.
+
+    Args:
+        df (pd.DataFrame): Cleaned census data as returned by CensusModel.load_data
+        n_bins (int): Number of quantile bins per numeric feature
+
+    Returns:
+        Dict[str, Dict]: Reference bins and expected bin fractions per feature
+    """
+    reference = {}
+
+    for col in CATEGORICAL_FEATURES:
+        frequencies = df[col].value_counts(normalize=True)
+        categories = [str(category) for category in frequencies.index]
+        reference[col] = {
+            'type': 'categorical',
+            'categories': categories,
+            # Last bin collects categories never seen in training
+            'expected': frequencies.tolist() + [0.0]
+        }
+
+    for col in NUMERIC_FEATURES:
+        values = df[col].to_numpy(dtype=float)
+        quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+        edges = np.unique(quantiles).tolist()
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        reference[col] = {
+            'type': 'numeric',
+            'edges': edges,
+            'expected': (counts / counts.sum()).tolist()
+        }
+
+    return reference
+
+
+def save_reference(reference: Dict[str, Dict], path: str):
+    """
+    Save reference sketches as JSON.
+
+    Args:
+        reference (Dict[str, Dict]): Output of `build_reference`
+        path (str): Destination path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(reference, f, indent=2)
+
+
+def load_reference(path: str) -> Dict[str, Dict]:
+    """
+    Load reference sketches saved with `save_reference`.
+
+    Args:
+        path (str): Path to the JSON file
+
+    Returns:
+        Dict[str, Dict]: Reference sketches
+    """
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def psi(expected: List[float], actual: List[float]) -> float:
+    """Population stability index between two binned distributions."""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, _EPSILON)
+        a = max(a, _EPSILON)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def ks(expected: List[float], actual: List[float]) -> float:
+    """Kolmogorov-Smirnov statistic on binned distributions (max CDF gap)."""
+    gap = cdf_e = cdf_a = 0.0
+    for e, a in zip(expected, actual):
+        cdf_e += e
+        cdf_a += a
+        gap = max(gap, abs(cdf_a - cdf_e))
+    return gap
+
+
+class DriftMonitor:
+    """
+    Fixed-size live sketches compared against training-time reference sketches.
+    """
+
+    def __init__(self, reference: Dict[str, Dict]):
+        self.reference = reference
+        self._lock = threading.Lock()
+        self._index = {
+            col: {category: i for i, category in enumerate(spec['categories'])}
+            for col, spec in reference.items() if spec['type'] == 'categorical'
+        }
+        self.reset()
+
+    def reset(self):
+        """Clear all live counts."""
+        with self._lock:
+            self.observations = 0
+            self.counts = {col: [0] * len(spec['expected']) for col, spec in self.reference.items()}
+
+    def update(self, record: Dict):
+        """
+        Add one record to the live sketches.
+
+        Args:
+            record (Dict): Record keyed by census column name
+        """
+        with self._lock:
+            self.observations += 1
+            for col, spec in self.reference.items():
+                if spec['type'] == 'categorical':
+                    index = self._index[col]
+                    self.counts[col][index.get(str(record[col]), len(index))] += 1
+                else:
+                    self.counts[col][bisect_right(spec['edges'], record[col])] += 1
+
+    def report(self) -> Dict:
+        """
+        Compare live sketches with the reference.
+
+        Returns:
+            Dict: Per-feature PSI (plus KS for numeric features) and drift status
+        """
+        with self._lock:
+            observations = self.observations
+            counts = {col: list(values) for col, values in self.counts.items()}
+
+        features = {}
+        drifted = []
+        for col, spec in self.reference.items():
+            expected = spec['expected']
+            actual = [count / observations for count in counts[col]] if observations else [0.0] * len(expected)
+            feature_report = {'type': spec['type'], 'psi': psi(expected, actual) if observations else 0.0}
+            if spec['type'] == 'numeric':
+                feature_report['ks'] = ks(expected, actual) if observations else 0.0
+            else:
+                feature_report['unseen_fraction'] = actual[-1]
+
+            if feature_report['psi'] >= PSI_ALERT:
+                feature_report['status'] = 'drift'
+                drifted.append(col)
+            elif feature_report['psi'] >= PSI_WARNING:
+                feature_report['status'] = 'warning'
+            else:
+                feature_report['status'] = 'stable'
+            features[col] = feature_report
+
+        return {
+            'observations': observations,
+            'drifted_features': drifted,
+            'features': features
+        }
@@ -0,0 +1,112 @@
+"""
+Delayed-label feedback and rolling accuracy metrics for the census model.
+
+Predictions are remembered in a bounded index keyed by request id. When the
+true label arrives the prediction is looked up, removed from the index and
+added to a fixed-size window of (prediction, label) pairs. Confusion counts
+are kept incrementally, so every update and every metrics read is O(1) and
+memory stays bounded however much traffic the API serves.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Dict
+
+
+class FeedbackTracker:
+    """
+    Joins delayed labels to recent predictions and tracks windowed metrics.
+
+    Args:
+        max_pending (int): Predictions kept awaiting a label; oldest evicted first
+        window (int): Number of most recent labelled predictions in the metrics
+    """
+
+    def __init__(self, max_pending: int = 100000, window: int = 1000):
+        self.max_pending = max_pending
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._recent = deque()
+        # Confusion counts over the window, positive class is 1 (>50K)
+        self._tp = self._fp = self._fn = self._tn = 0
+        self.matched = 0
+        self.unmatched = 0
+        self.evicted = 0
+
+    def register(self, request_id: str, prediction: int):
+        """
+        Remember a prediction until its label arrives.
+
+        Args:
+            request_id (str): Id returned to the client
+            prediction (int): Predicted class, 0 or 1
+        """
+        with self._lock:
+            self._pending[request_id] = prediction
+            if len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.evicted += 1
+
+    def record(self, request_id: str, label: int) -> bool:
+        """
+        Join a true label to its prediction.
+
+        Args:
+            request_id (str): Id of the scored request
+            label (int): True class, 0 or 1
+
+        Returns:
+            bool: False if the prediction is unknown, already labelled or evicted
+        """
+        with self._lock:
+            prediction = self._pending.pop(request_id, None)
+            if prediction is None:
+                self.unmatched += 1
+                return False
+
+            self.matched += 1
+            self._recent.append((prediction, label))
+            self._count(prediction, label, 1)
+            if len(self._recent) > self.window:
+                self._count(*self._recent.popleft(), -1)
+            return True
+
+    def metrics(self) -> Dict:
+        """
+        Rolling metrics over the most recent labelled predictions.
+
+        Returns:
+            Dict: Accuracy, precision, recall and F1 for the >50K class, window
+            fill, and join counters
+        """
+        with self._lock:
+            tp, fp, fn, tn = self._tp, self._fp, self._fn, self._tn
+            pending = len(self._pending)
+
+        total = tp + fp + fn + tn
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        return {
+            "window": self.window,
+            "labelled": total,
+            "accuracy": (tp + tn) / total if total else 0.0,
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            "confusion": {"tp": tp, "fp": fp, "fn": fn, "tn": tn},
+            "pending": pending,
+            "matched": self.matched,
+            "unmatched": self.unmatched,
+            "evicted": self.evicted
+        }
+
+    def _count(self, prediction: int, label: int, delta: int):
+        if prediction == 1 and label == 1:
+            self._tp += delta
+        elif prediction == 1:
+            self._fp += delta
+        elif label == 1:
+            self._fn += delta
+        else:
+            self._tn += delta
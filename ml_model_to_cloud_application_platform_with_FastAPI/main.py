@@ -2,33 +2,141 @@
 FastAPI application for Census Income Prediction Model
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Literal
+from fastapi import FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
+from typing import Any, Dict, List, Literal, Optional, Tuple
 from contextlib import asynccontextmanager
-import pandas as pd
-from model import CensusModel
+import asyncio
+import json
+import os
+import threading
+import uuid
+from starlette.concurrency import run_in_threadpool
+from admission import AdmissionController, AdmissionRejected
+from drift import DriftMonitor, load_reference
+from feedback import FeedbackTracker
+from inference import CensusPredictor
+from prediction_log import PredictionLogger
+from slice_jobs import SliceJobManager, file_fingerprint
+
+MODEL_PATH = "model/model.pkl"
+ENCODER_PATH = "model/encoders.pkl"
+PREDICTOR_PATH = "model/model.npz"
+DRIFT_REFERENCE_PATH = "model/drift_reference.json"
+
+# Slice jobs may only read datasets inside this directory
+SLICE_DATA_DIR = os.getenv("SLICE_DATA_DIR", ".")
 
 # Global model variable
 model = None
 
+# Batches larger than this are scored by the scikit-learn model, which is faster
+# than the numpy-only predictor on large batches; loaded on first use
+PREDICTOR_MAX_BATCH = int(os.getenv("PREDICTOR_MAX_BATCH", "1000"))
+batch_model = None
+batch_model_lock = threading.Lock()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Load the trained model on startup."""
-    global model
+# Live feature-drift sketches, None until a reference is available
+drift_monitor = None
+
+# WebSocket streaming: messages buffered per connection and scored per batch
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_MAX_BATCH = int(os.getenv("WS_MAX_BATCH", "64"))
+
+# Background logging of scored requests for retraining, enabled by PREDICTION_LOG_DIR
+prediction_logger = None
+if os.getenv("PREDICTION_LOG_DIR"):
+    prediction_logger = PredictionLogger(
+        os.getenv("PREDICTION_LOG_DIR"),
+        max_buffer=int(os.getenv("PREDICTION_LOG_BUFFER", "10000")),
+        flush_interval=float(os.getenv("PREDICTION_LOG_FLUSH_SECONDS", "5"))
+    )
+
+# Admission control for /predict, configurable through the environment
+admission = AdmissionController(
+    max_concurrency=int(os.getenv("MAX_CONCURRENT_PREDICTIONS", "4")),
+    max_queue=int(os.getenv("MAX_QUEUED_PREDICTIONS", "32")),
+    queue_timeout=float(os.getenv("PREDICTION_QUEUE_TIMEOUT", "5")),
+    retry_after=int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+)
+
+
+def load_predictor() -> CensusPredictor:
+    """
+    Load the numpy-only predictor used for serving.
+
+    The export is read directly when it is at least as new as the pickled
+    model. Otherwise the full CensusModel is loaded (or trained if missing),
+    exported and saved, so only that first start pays for scikit-learn.
+    """
+    if os.path.exists(PREDICTOR_PATH) and (
+        not os.path.exists(MODEL_PATH) or os.path.getmtime(PREDICTOR_PATH) >= os.path.getmtime(MODEL_PATH)
+    ):
+        return CensusPredictor.load(PREDICTOR_PATH)
+
+    from model import CensusModel
     try:
-        model = CensusModel()
-        model.load_model("model/model.pkl", "model/encoders.pkl")
-        print("Model loaded successfully!")
+        census_model = CensusModel()
+        census_model.load_model(MODEL_PATH, ENCODER_PATH)
     except Exception as e:
         print(f"Error loading model: {e}")
         # If model files don't exist, train a new one
         print("Training new model...")
         from train_model import train_model
-        model, _ = train_model()
+        census_model, _ = train_model()
+
+    predictor = CensusPredictor.from_census_model(census_model)
+    predictor.save(PREDICTOR_PATH)
+    return predictor
+
+
+def load_census_model():
+    """Load the full scikit-learn CensusModel, used for slice evaluation."""
+    from model import CensusModel
+    census_model = CensusModel()
+    census_model.load_model(MODEL_PATH, ENCODER_PATH)
+    return census_model
+
+
+def _batch_model():
+    """Load the scikit-learn CensusModel for large batches on first use; None without a pickled model."""
+    global batch_model
+    with batch_model_lock:
+        if batch_model is None and os.path.exists(MODEL_PATH):
+            batch_model = load_census_model()
+    return batch_model
+
+
+def load_drift_monitor():
+    """Create the drift monitor from the training-time reference, if present."""
+    if not os.path.exists(DRIFT_REFERENCE_PATH):
+        print(f"No drift reference at {DRIFT_REFERENCE_PATH}, drift monitoring disabled")
+        return None
+    return DriftMonitor(load_reference(DRIFT_REFERENCE_PATH))
+
+
+# Recent predictions awaiting their true label, and rolling metrics over labelled ones
+feedback_tracker = FeedbackTracker(
+    max_pending=int(os.getenv("FEEDBACK_MAX_PENDING", "100000")),
+    window=int(os.getenv("FEEDBACK_WINDOW", "1000"))
+)
+
+# Background slice-evaluation jobs with results cached per model, dataset and features
+slice_jobs = SliceJobManager(load_census_model)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the trained model on startup."""
+    global model, drift_monitor
+    model = load_predictor()
+    drift_monitor = load_drift_monitor()
+    print("Model loaded successfully!")
+    if prediction_logger is not None:
+        prediction_logger.start()
     yield
-    # Cleanup code here if needed
+    if prediction_logger is not None:
+        prediction_logger.stop()
 
 
 # Initialize FastAPI app
@@ -83,6 +191,23 @@ class CensusData(BaseModel):
 class PredictionResponse(BaseModel):
     prediction: Literal[0, 1] = Field(..., description="Prediction: 0 for <=50K, 1 for >50K")
     prediction_label: str = Field(..., description="Human-readable prediction")
+    request_id: str = Field(..., description="Id to report the true label with via POST /feedback")
+
+
+# Request body for delayed-label feedback
+class FeedbackItem(BaseModel):
+    request_id: str = Field(..., description="request_id returned by /predict")
+    label: Literal[0, 1, "<=50K", ">50K"] = Field(..., description="True income: 0/'<=50K' or 1/'>50K'")
+
+
+class FeedbackRequest(BaseModel):
+    feedback: List[FeedbackItem] = Field(..., min_length=1, description="True labels for scored requests")
+
+
+# Request body for slice-evaluation jobs
+class SliceJobRequest(BaseModel):
+    dataset: str = Field("census.csv", description="Census-format CSV in SLICE_DATA_DIR to evaluate on")
+    features: List[str] = Field(["education"], min_length=1, description="Categorical features to slice on")
 
 
 @app.get("/")
@@ -94,6 +219,14 @@ async def root():
         "endpoints": {
             "GET /": "This welcome message",
             "POST /predict": "Make income predictions",
+            "WS /ws/predict": "Stream predictions for id-tagged records over a WebSocket",
+            "POST /slices/jobs": "Start a background slice evaluation (cached per model, dataset and features)",
+            "GET /slices/jobs/{job_id}": "Slice evaluation progress and results",
+            "POST /feedback": "Report true labels for scored requests by request_id",
+            "GET /feedback/metrics": "Rolling accuracy, precision, recall and F1 from feedback",
+            "GET /admission": "Concurrency, queue depth and shed counts for /predict",
+            "GET /drift": "Feature drift of live /predict inputs against the training data",
+            "GET /prediction-log": "Status of background prediction logging",
             "GET /docs": "Interactive API documentation"
         }
     }
@@ -107,54 +240,289 @@ async def predict_income(data: CensusData):
     Returns:
     - prediction: 0 for <=50K, 1 for >50K
     - prediction_label: Human-readable prediction
+
+    Returns 503 with a Retry-After header when the service is overloaded.
     """
-    global model
+    try:
+        async with admission.slot():
+            return await run_in_threadpool(_predict_income, data)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service overloaded ({e.reason}), retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def _ensure_loaded():
+    """Load the model and drift monitor if the lifespan hook has not run."""
+    global model, drift_monitor
     if model is None:
-        # Try to load model if not already loaded
-        try:
-            model = CensusModel()
-            model.load_model("model/model.pkl", "model/encoders.pkl")
-        except Exception:
-            # If model files don't exist, train a new one
-            from train_model import train_model
-            model, _ = train_model()
+        # Load model if not already loaded
+        model = load_predictor()
+        drift_monitor = load_drift_monitor()
 
-    try:
-        # Convert Pydantic model to DataFrame
-        input_data = {
-            "age": data.age,
-            "workclass": data.workclass,
-            "fnlgt": data.fnlgt,
-            "education": data.education,
-            "education-num": data.education_num,
-            "marital-status": data.marital_status,
-            "occupation": data.occupation,
-            "relationship": data.relationship,
-            "race": data.race,
-            "sex": data.sex,
-            "capital-gain": data.capital_gain,
-            "capital-loss": data.capital_loss,
-            "hours-per-week": data.hours_per_week,
-            "native-country": data.native_country
-        }
 
-        # Create DataFrame
-        df = pd.DataFrame([input_data])
+def _to_record(data: CensusData) -> Dict:
+    """Convert a CensusData request into a record keyed by census column name."""
+    return {
+        "age": data.age,
+        "workclass": data.workclass,
+        "fnlgt": data.fnlgt,
+        "education": data.education,
+        "education-num": data.education_num,
+        "marital-status": data.marital_status,
+        "occupation": data.occupation,
+        "relationship": data.relationship,
+        "race": data.race,
+        "sex": data.sex,
+        "capital-gain": data.capital_gain,
+        "capital-loss": data.capital_loss,
+        "hours-per-week": data.hours_per_week,
+        "native-country": data.native_country
+    }
+
+
+def _score_records(records: List[Dict]) -> List[Tuple[str, int, str]]:
+    """
+    Predict a batch of records and feed the drift monitor, prediction log and feedback index.
+
+    Args:
+        records (List[Dict]): Records keyed by census column name
+
+    Returns:
+        List[Tuple[str, int, str]]: Request id, prediction and human-readable label per record
+    """
+    _ensure_loaded()
 
-        # Make prediction
-        prediction = model.predict(df)[0]
+    # Make predictions
+    census_model = _batch_model() if len(records) > PREDICTOR_MAX_BATCH else None
+    if census_model is not None:
+        import pandas as pd
+        predictions = [int(prediction) for prediction in census_model.predict(pd.DataFrame(records))]
+    else:
+        predictions = [int(prediction) for prediction in model.predict(records)]
 
+    results = []
+    for record, prediction in zip(records, predictions):
         # Convert prediction to label
         prediction_label = ">50K" if prediction == 1 else "<=50K"
 
+        if drift_monitor is not None:
+            drift_monitor.update(record)
+        if prediction_logger is not None:
+            prediction_logger.log(record, prediction_label)
+
+        request_id = uuid.uuid4().hex
+        feedback_tracker.register(request_id, prediction)
+        results.append((request_id, prediction, prediction_label))
+
+    return results
+
+
+def _predict_income(data: CensusData) -> PredictionResponse:
+    """Run a single prediction; called from a worker thread."""
+    try:
+        request_id, prediction, prediction_label = _score_records([_to_record(data)])[0]
+
         return PredictionResponse(
             prediction=prediction,
-            prediction_label=prediction_label
+            prediction_label=prediction_label,
+            request_id=request_id
         )
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
 
+
+@app.websocket("/ws/predict")
+async def predict_stream(websocket: WebSocket):
+    """
+    Stream predictions over a long-lived WebSocket connection.
+
+    Each message is `{"id": <client id>, "data": <CensusData>}`. Every message
+    gets a reply tagged with its id, either `prediction`/`prediction_label` or
+    `error`. Messages that arrive while a batch is being scored are batched
+    through the model together. When the bounded queue is full the server
+    stops reading, which pushes back on clients that send too fast. If the
+    scorer stops, e.g. because a reply could not be sent, nothing drains the
+    queue any more, so the connection is closed with code 1011.
+    """
+    await websocket.accept()
+    await run_in_threadpool(_ensure_loaded)
+
+    pending = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+    send_lock = asyncio.Lock()
+    scorer = asyncio.create_task(_score_stream(websocket, pending, send_lock))
+    put = None
+
+    try:
+        while not scorer.done():
+            message_id, record, error = _parse_stream_message(await websocket.receive_text())
+            if error is not None:
+                async with send_lock:
+                    await websocket.send_json({"id": message_id, "error": error})
+                continue
+            # Waits while the queue is full, so the client is not read from faster than we score,
+            # but only as long as the scorer is alive to drain it
+            put = asyncio.ensure_future(pending.put((message_id, record)))
+            await asyncio.wait({put, scorer}, return_when=asyncio.FIRST_COMPLETED)
+        await websocket.close(code=1011)
+    except (WebSocketDisconnect, RuntimeError):
+        # The client went away, or the socket was closed while the scorer failed to send
+        pass
+    finally:
+        for task in (put, scorer):
+            if task is not None and not task.done():
+                task.cancel()
+        try:
+            await scorer
+        except (asyncio.CancelledError, Exception):
+            # A scorer that failed has already ended the stream
+            pass
+
+
+def _parse_stream_message(text: str) -> Tuple[Any, Optional[Dict], Optional[str]]:
+    """Parse one WebSocket message into (id, record, error)."""
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return None, None, "Invalid JSON"
+    if not isinstance(message, dict):
+        return None, None, "Message must be a JSON object"
+
+    message_id = message.get("id")
+    try:
+        data = CensusData.model_validate(message.get("data"))
+    except ValidationError as e:
+        return message_id, None, f"Invalid data: {e.errors(include_url=False)}"
+    return message_id, _to_record(data), None
+
+
+async def _score_stream(websocket: WebSocket, pending: asyncio.Queue, send_lock: asyncio.Lock):
+    """Score queued stream messages in batches and send tagged replies."""
+    while True:
+        batch = [await pending.get()]
+        while len(batch) < WS_MAX_BATCH and not pending.empty():
+            batch.append(pending.get_nowait())
+
+        message_ids = [message_id for message_id, _ in batch]
+        try:
+            async with admission.slot():
+                results = await run_in_threadpool(_score_records, [record for _, record in batch])
+            replies = [
+                {"id": message_id, "request_id": request_id, "prediction": prediction,
+                 "prediction_label": prediction_label}
+                for message_id, (request_id, prediction, prediction_label) in zip(message_ids, results)
+            ]
+        except AdmissionRejected as e:
+            replies = [
+                {"id": message_id, "error": f"Service overloaded ({e.reason})", "retry_after": e.retry_after}
+                for message_id in message_ids
+            ]
+        except Exception as e:
+            replies = [{"id": message_id, "error": f"Prediction failed: {str(e)}"} for message_id in message_ids]
+
+        async with send_lock:
+            for reply in replies:
+                await websocket.send_json(reply)
+
+
+def _slice_dataset_path(dataset: str) -> str:
+    """Resolve a requested dataset inside SLICE_DATA_DIR, rejecting paths that escape it."""
+    data_dir = os.path.realpath(SLICE_DATA_DIR)
+    path = os.path.realpath(os.path.join(data_dir, dataset))
+    if os.path.commonpath([data_dir, path]) != data_dir or not path.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Dataset must be a CSV file inside the data directory")
+    return path
+
+
+@app.post("/slices/jobs", status_code=202)
+async def start_slice_job(request: SliceJobRequest, response: Response):
+    """
+    Start slice evaluation over a dataset in the background.
+
+    Returns the job immediately (202). If the same model version, dataset
+    content and features were evaluated before, the cached result is
+    returned at once with status 'completed' (200).
+    """
+    dataset = _slice_dataset_path(request.dataset)
+    if not os.path.isfile(dataset):
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {request.dataset}")
+    if not os.path.exists(MODEL_PATH) or not os.path.exists(ENCODER_PATH):
+        raise HTTPException(status_code=503, detail=f"No trained model at {MODEL_PATH}, run train_model.py")
+
+    # The encoders are part of the model version, so results are not reused across re-fitted encoders
+    model_version, dataset_hash = await run_in_threadpool(
+        lambda: (f"{file_fingerprint(MODEL_PATH)}:{file_fingerprint(ENCODER_PATH)}", file_fingerprint(dataset))
+    )
+    job = slice_jobs.submit(dataset, request.features, model_version, dataset_hash)
+    if job["status"] == "completed":
+        response.status_code = 200
+    return job
+
+
+@app.get("/slices/jobs/{job_id}")
+async def get_slice_job(job_id: str):
+    """Report slice evaluation status, progress and, once completed, results."""
+    job = slice_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/feedback")
+async def submit_feedback(request: FeedbackRequest):
+    """
+    Join true labels to recently scored requests.
+
+    Labels for request ids that are unknown, already labelled or evicted from
+    the bounded index are reported back as unmatched.
+    """
+    unmatched = []
+    for item in request.feedback:
+        label = item.label if isinstance(item.label, int) else int(item.label == ">50K")
+        if not feedback_tracker.record(item.request_id, label):
+            unmatched.append(item.request_id)
+    return {"matched": len(request.feedback) - len(unmatched), "unmatched": unmatched}
+
+
+@app.get("/feedback/metrics")
+async def feedback_metrics():
+    """Report rolling accuracy, precision, recall and F1 over recent labelled predictions."""
+    return feedback_tracker.metrics()
+
+
+@app.get("/admission")
+async def admission_status():
+    """Report current concurrency, queue depth and shed count for /predict."""
+    return admission.stats()
+
+
+@app.get("/prediction-log")
+async def prediction_log_status():
+    """Report buffered, written and dropped counts of the prediction logger."""
+    if prediction_logger is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_logger.stats()}
+
+
+@app.get("/drift")
+async def drift_report():
+    """
+    Compare live /predict inputs with the training data.
+
+    Returns per-feature PSI (and binned KS for numeric features) computed from
+    fixed-size sketches; raw requests are not stored.
+    """
+    global drift_monitor
+    if drift_monitor is None:
+        drift_monitor = load_drift_monitor()
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="No drift reference available, run train_model.py")
+    return drift_monitor.report()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
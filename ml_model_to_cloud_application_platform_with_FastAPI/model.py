@@ -4,13 +4,12 @@ Machine Learning Model for Census Income Prediction
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 import joblib
 import os
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+# scikit-learn is imported inside the methods that need it so that importing
+# this module stays cheap; serving uses the numpy-only path in inference.py.
 
 
 class CensusModel:
@@ -19,6 +18,8 @@ class CensusModel:
     """
 
     def __init__(self):
+        from sklearn.ensemble import RandomForestClassifier
+
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
         self.label_encoders = {}
         self.feature_columns = []
@@ -66,6 +67,8 @@ class CensusModel:
         Returns:
             Tuple[pd.DataFrame, pd.Series]: Features and target
         """
+        from sklearn.preprocessing import LabelEncoder
+
         # Separate features and target
         X = df.drop('income', axis=1)
         y = df['income']
@@ -106,6 +109,9 @@ class CensusModel:
         Returns:
             Dict[str, float]: Training metrics
         """
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
         # Split the data
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=y
@@ -159,13 +165,15 @@ class CensusModel:
 
         return self.model.predict(X)
 
-    def save_model(self, model_path: str, encoder_path: str):
+    def save_model(self, model_path: str, encoder_path: str, predictor_path: Optional[str] = None):
         """
         Save the trained model and encoders.
 
         Args:
             model_path (str): Path to save the model
             encoder_path (str): Path to save the encoders
+            predictor_path (Optional[str]): Path to also save the numpy-only
+                inference export used by the API
         """
         if not self.is_trained:
             raise ValueError("Model must be trained before saving")
@@ -178,6 +186,10 @@ class CensusModel:
         joblib.dump(self.model, model_path)
         joblib.dump(self.label_encoders, encoder_path)
 
+        if predictor_path:
+            from inference import CensusPredictor
+            CensusPredictor.from_census_model(self).save(predictor_path)
+
     def load_model(self, model_path: str, encoder_path: str):
         """
         Load a trained model and encoders.
@@ -212,8 +224,12 @@ class CensusModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before calculating slice performance")
 
-        # Preprocess the data
-        X, y = self.preprocess_data(df)
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+        # Encode with the trained encoders; re-fitting them here would change the
+        # category codes for any dataset other than the training set
+        y = self.label_encoders[self.target_column].transform(df[self.target_column])
+        predictions = self.predict(df)
 
         # Get unique values for the feature
         unique_values = df[feature].unique()
@@ -221,15 +237,13 @@ class CensusModel:
 
         for value in unique_values:
             # Create slice
-            mask = df[feature] == value
-            X_slice = X[mask]
+            mask = (df[feature] == value).to_numpy()
             y_slice = y[mask]
 
-            if len(X_slice) == 0:
+            if len(y_slice) == 0:
                 continue
 
-            # Make predictions using the preprocessed data
-            y_pred = self.model.predict(X_slice)
+            y_pred = predictions[mask]
 
             # Calculate metrics
             slice_performance[value] = {
@@ -237,7 +251,7 @@ class CensusModel:
                 'precision': precision_score(y_slice, y_pred, average='weighted', zero_division=0),
                 'recall': recall_score(y_slice, y_pred, average='weighted', zero_division=0),
                 'f1': f1_score(y_slice, y_pred, average='weighted', zero_division=0),
-                'count': len(X_slice)
+                'count': len(y_slice)
             }
 
         return slice_performance
@@ -268,9 +282,14 @@ def train_model():
 
     # Save model
     print("Saving model...")
-    model.save_model('model/model.pkl', 'model/encoders.pkl')
+    model.save_model('model/model.pkl', 'model/encoders.pkl', 'model/model.npz')
     print("Model saved successfully!")
 
+    # Reference sketches for live drift monitoring
+    from drift import build_reference, save_reference
+    save_reference(build_reference(df), 'model/drift_reference.json')
+    print("Drift reference saved!")
+
     return model, df
 
 
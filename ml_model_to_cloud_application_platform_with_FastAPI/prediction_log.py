@@ -0,0 +1,155 @@
+"""
+Background logging of scored predictions for offline retraining.
+
+Records are buffered in a bounded in-memory queue and written in batches by a
+daemon thread to rotating gzip-compressed CSV files. The files use the same
+headerless column layout as census.csv, with the predicted label in the
+`income` column, so `CensusModel.load_data` reads them directly.
+"""
+
+import csv
+import gzip
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+CENSUS_COLUMNS = [
+    'age', 'workclass', 'fnlgt', 'education', 'education-num',
+    'marital-status', 'occupation', 'relationship', 'race', 'sex',
+    'capital-gain', 'capital-loss', 'hours-per-week', 'native-country', 'income'
+]
+
+
+class PredictionLogger:
+    """
+    Asynchronous, bounded-memory prediction logger.
+
+    `log` never blocks: when the buffer is full the new record is dropped and
+    counted, so an overloaded disk cannot add latency to predictions.
+    """
+
+    def __init__(self, directory: str, max_buffer: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 5.0, max_rows_per_file: int = 100000):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows_per_file = max_rows_per_file
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.files_written = 0
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._stop = threading.Event()
+        self._thread = None
+        self._current_path = None
+        self._current_rows = 0
+
+    def start(self):
+        """Start the background writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prediction-logger", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Flush buffered records and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def log(self, record: Dict, prediction_label: str) -> bool:
+        """
+        Queue one scored record for writing.
+
+        Args:
+            record (Dict): Input record keyed by census column name
+            prediction_label (str): Predicted income label, e.g. '>50K'
+
+        Returns:
+            bool: False if the record was dropped because the buffer is full
+        """
+        row = [record[col] for col in CENSUS_COLUMNS[:-1]]
+        row.append(prediction_label)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.logged += 1
+        return True
+
+    def stats(self) -> Dict:
+        """
+        Logger counters.
+
+        Returns:
+            Dict: Buffered, written and dropped record counts and the current file
+        """
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "directory": self.directory,
+            "buffered": self._queue.qsize(),
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "files_written": self.files_written,
+            "current_file": self._current_path
+        }
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, min(0.5, deadline - time.monotonic()))))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline or stopping:
+                if stopping:
+                    # Drain whatever is still buffered before exiting
+                    batch.extend(self._drain())
+                for start in range(0, len(batch), self.batch_size):
+                    self._write(batch[start:start + self.batch_size])
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                if stopping:
+                    return
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write(self, batch):
+        if self._current_path is None or self._current_rows >= self.max_rows_per_file:
+            self._rotate()
+
+        # Appending adds a gzip member per batch; gzip and pandas read members transparently
+        try:
+            with gzip.open(self._current_path, 'at', newline='') as f:
+                csv.writer(f).writerows(batch)
+        except OSError as e:
+            print(f"Error writing prediction log: {e}")
+            self.dropped += len(batch)
+            return
+        self._current_rows += len(batch)
+        self.written += len(batch)
+
+    def _rotate(self):
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        self.files_written += 1
+        self._current_path = os.path.join(
+            self.directory, f"predictions-{timestamp}-{os.getpid()}-{self.files_written:04d}.csv.gz"
+        )
+        self._current_rows = 0
@@ -0,0 +1,193 @@
+"""
+Background slice-evaluation jobs for the Census Income Prediction API.
+
+Slice evaluation (`CensusModel.get_slice_performance`) runs on a single
+worker thread so request handlers never block on it. Finished results are
+cached by (model version, dataset hash, features), so a repeated request is
+answered from the cache without re-running the evaluation.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# File digests per (path, size, mtime), least recently used evicted first
+MAX_FINGERPRINTS = 256
+_fingerprints = OrderedDict()
+_fingerprints_lock = threading.Lock()
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    SHA-256 of a file's content, memoized on its size and modification time.
+
+    Only the MAX_FINGERPRINTS most recently used digests are kept.
+
+    Args:
+        path (str): File to fingerprint
+
+    Returns:
+        str: Hex digest
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _fingerprints_lock:
+        if key in _fingerprints:
+            _fingerprints.move_to_end(key)
+            return _fingerprints[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    with _fingerprints_lock:
+        _fingerprints[key] = digest.hexdigest()
+        while len(_fingerprints) > MAX_FINGERPRINTS:
+            _fingerprints.popitem(last=False)
+    return digest.hexdigest()
+
+
+class SliceJobManager:
+    """
+    Runs slice evaluations in the background and caches their results.
+
+    Args:
+        load_model (Callable): Returns a trained CensusModel; called again
+            whenever the model version changes
+        max_jobs (int): Job records kept for status queries
+        max_results (int): Cached results kept, least recently used evicted first
+    """
+
+    def __init__(self, load_model: Callable, max_jobs: int = 100, max_results: int = 32):
+        self._load_model = load_model
+        self.max_jobs = max_jobs
+        self.max_results = max_results
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slice-jobs")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._results = OrderedDict()
+        self._model = None
+        self._model_version = None
+
+    def submit(self, dataset_path: str, features: List[str], model_version: str, dataset_hash: str) -> Dict:
+        """
+        Start a slice evaluation, or answer it from the cache.
+
+        Args:
+            dataset_path (str): Census-format CSV to evaluate on
+            features (List[str]): Features to slice on
+            model_version (str): Fingerprint of the model artifact
+            dataset_hash (str): Fingerprint of the dataset
+
+        Returns:
+            Dict: Job description; `status` is 'completed' for cache hits
+        """
+        features = sorted(set(features))
+        key = (model_version, dataset_hash, tuple(features))
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                job = self._new_job(key, dataset_path, status="completed", cached=True)
+                job["progress"]["completed"] = len(features)
+                job["result"] = self._results[key]
+                job["finished_at"] = job["created_at"]
+                return self._public(job)
+
+            # Share a job that is already evaluating the same key
+            for job in reversed(self._jobs.values()):
+                if job["key"] == key and job["status"] in ("queued", "running"):
+                    return self._public(job)
+
+            job = self._new_job(key, dataset_path, status="queued", cached=False)
+
+        self._executor.submit(self._run, job)
+        return self._public(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Id returned by `submit`
+
+        Returns:
+            Optional[Dict]: Job description, or None if unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job is not None else None
+
+    def _new_job(self, key, dataset_path: str, status: str, cached: bool) -> Dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "key": key,
+            "dataset": dataset_path,
+            "status": status,
+            "cached": cached,
+            "progress": {"completed": 0, "total": len(key[2])},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None
+        }
+        self._jobs[job["job_id"]] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def _run(self, job: Dict):
+        model_version, _, features = job["key"]
+        with self._lock:
+            job["status"] = "running"
+        try:
+            if self._model is None or self._model_version != model_version:
+                self._model = self._load_model()
+                self._model_version = model_version
+            df = self._model.load_data(job["dataset"])
+
+            missing = [feature for feature in features if feature not in df.columns]
+            if missing:
+                raise ValueError(f"Unknown features: {missing}")
+
+            result = {}
+            for feature in features:
+                performance = self._model.get_slice_performance(df, feature)
+                result[feature] = {
+                    str(value): {
+                        metric: int(score) if metric == 'count' else float(score)
+                        for metric, score in metrics.items()
+                    }
+                    for value, metrics in performance.items()
+                }
+                with self._lock:
+                    job["progress"]["completed"] += 1
+
+            with self._lock:
+                self._results[job["key"]] = result
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+                job["result"] = result
+                job["status"] = "completed"
+                job["finished_at"] = time.time()
+        except Exception as e:
+            with self._lock:
+                job["error"] = str(e)
+                job["status"] = "failed"
+                job["finished_at"] = time.time()
+
+    @staticmethod
+    def _public(job: Dict) -> Dict:
+        model_version, dataset_hash, features = job["key"]
+        public = {k: v for k, v in job.items() if k != "key"}
+        public["progress"] = dict(job["progress"])
+        public["model_version"] = model_version
+        public["dataset_hash"] = dataset_hash
+        public["features"] = list(features)
+        return public
@@ -2,15 +2,38 @@
 Unit tests for the FastAPI application
 """
 
+import asyncio
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
 from model import CensusModel
+from admission import AdmissionController, AdmissionRejected
+from drift import DriftMonitor
+from feedback import FeedbackTracker
+from prediction_log import PredictionLogger
 
 
 # Create test client
 client = TestClient(app)
 
+SAMPLE_RECORD = {
+    "age": 45,
+    "workclass": "State-gov",
+    "fnlgt": 2334,
+    "education": "Bachelors",
+    "education-num": 13,
+    "marital-status": "Never-married",
+    "occupation": "Prof-specialty",
+    "relationship": "Wife",
+    "race": "Black",
+    "sex": "Female",
+    "capital-gain": 2174,
+    "capital-loss": 0,
+    "hours-per-week": 60,
+    "native-country": "Cuba"
+}
+
 
 def setup_module():
     """Set up the model for testing."""
@@ -176,6 +199,407 @@ def test_predict_edge_cases():
     assert "prediction_label" in data
 
 
+def test_admission_endpoint():
+    """Test that admission control state is exposed."""
+    response = client.get("/admission")
+    assert response.status_code == 200
+
+    data = response.json()
+    for key in ["max_concurrency", "max_queue", "in_flight", "queued", "admitted", "shed"]:
+        assert key in data
+
+
+def test_predict_load_shedding(monkeypatch):
+    """Test that /predict sheds load with 503 and Retry-After when full."""
+    import main
+
+    monkeypatch.setattr(main, "admission", AdmissionController(max_concurrency=0, max_queue=0, retry_after=7))
+
+    response = client.post("/predict", json=SAMPLE_RECORD)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert client.get("/admission").json()["shed"] == 1
+
+
+def test_admission_queue_order_and_timeout():
+    """Test that queued requests are admitted in order and time out when waiting too long."""
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        order = []
+
+        async def worker(name, hold):
+            async with controller.slot():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        first = asyncio.create_task(worker("first", 0.02))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(worker("second", 0))
+        await asyncio.sleep(0)
+        # Slot and queue are both taken, so a third request is shed at once
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected, match="timed out"):
+            await controller.acquire()
+        controller.release()
+
+        stats = controller.stats()
+        assert stats["in_flight"] == 0
+        assert stats["queued"] == 0
+        assert stats["shed"] == 2
+        assert stats["timed_out"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_drift_endpoint():
+    """Test that /predict inputs are reflected in the drift report."""
+    before = client.get("/drift")
+    assert before.status_code == 200
+    observations = before.json()["observations"]
+
+    response = client.post("/predict", json=SAMPLE_RECORD)
+    assert response.status_code == 200
+
+    data = client.get("/drift").json()
+    assert data["observations"] == observations + 1
+    assert "drifted_features" in data
+    assert set(data["features"]) >= {"age", "education", "native-country"}
+    assert "ks" in data["features"]["age"]
+    assert data["features"]["education"]["status"] in ["stable", "warning", "drift"]
+
+
+def test_drift_monitor_detects_shift():
+    """Test that a skewed stream is flagged while a matching one is not."""
+    reference = {
+        "sex": {"type": "categorical", "categories": ["Male", "Female"], "expected": [0.5, 0.5, 0.0]},
+        "age": {"type": "numeric", "edges": [30, 50], "expected": [0.3, 0.4, 0.3]}
+    }
+    monitor = DriftMonitor(reference)
+
+    for sex, age in [("Male", 25), ("Female", 40), ("Male", 60), ("Female", 45)] * 10:
+        monitor.update({"sex": sex, "age": age})
+    assert monitor.report()["drifted_features"] == []
+
+    monitor.reset()
+    for _ in range(40):
+        monitor.update({"sex": "Male", "age": 70})
+    report = monitor.report()
+    assert report["observations"] == 40
+    assert set(report["drifted_features"]) == {"sex", "age"}
+    assert report["features"]["age"]["ks"] == pytest.approx(0.7)
+
+
+def test_prediction_log_logs_scored_requests(monkeypatch, tmp_path):
+    """Test that /predict hands scored records to the prediction logger."""
+    import main
+
+    logger = PredictionLogger(str(tmp_path))
+    monkeypatch.setattr(main, "prediction_logger", logger)
+
+    response = client.post("/predict", json=SAMPLE_RECORD)
+    assert response.status_code == 200
+
+    status = client.get("/prediction-log").json()
+    assert status["enabled"] is True
+    assert status["logged"] == 1
+    assert status["buffered"] == 1
+
+
+def test_large_batches_use_the_sklearn_model(monkeypatch):
+    """Test that batches above PREDICTOR_MAX_BATCH are scored by CensusModel with the same predictions."""
+    import main
+
+    main._ensure_loaded()
+    records = CensusModel().load_data("census.csv").head(20).drop("income", axis=1).to_dict("records")
+    expected = [int(prediction) for prediction in main.model.predict(records)]
+
+    monkeypatch.setattr(main, "PREDICTOR_MAX_BATCH", 10)
+    monkeypatch.setattr(main, "batch_model", None)
+    results = main._score_records(records)
+
+    assert main.batch_model is not None
+    assert [prediction for _, prediction, _ in results] == expected
+
+
+def test_websocket_stream_predictions():
+    """Test that streamed records get id-tagged predictions on the same connection."""
+    with client.websocket_connect("/ws/predict") as websocket:
+        for message_id in ["a", "b", "c"]:
+            websocket.send_json({"id": message_id, "data": SAMPLE_RECORD})
+        replies = [websocket.receive_json() for _ in range(3)]
+
+    assert [reply["id"] for reply in replies] == ["a", "b", "c"]
+    for reply in replies:
+        assert reply["request_id"]
+        assert reply["prediction"] in [0, 1]
+        assert reply["prediction_label"] in ["<=50K", ">50K"]
+
+
+def test_websocket_stream_invalid_messages():
+    """Test that invalid stream messages get an error reply without closing the connection."""
+    with client.websocket_connect("/ws/predict") as websocket:
+        websocket.send_text("not json")
+        assert websocket.receive_json() == {"id": None, "error": "Invalid JSON"}
+
+        websocket.send_json({"id": 7, "data": {"age": 45}})
+        reply = websocket.receive_json()
+        assert reply["id"] == 7
+        assert reply["error"].startswith("Invalid data")
+
+        websocket.send_json({"id": 8, "data": SAMPLE_RECORD})
+        assert websocket.receive_json()["id"] == 8
+
+
+def _hold_stream_scoring(monkeypatch):
+    """Block the first stream batch until released; record batch sizes and the stream queues."""
+    import threading
+    import main
+
+    release = threading.Event()
+    batch_sizes = []
+    queues = []
+    score_records = main._score_records
+
+    def held_score_records(records):
+        batch_sizes.append(len(records))
+        release.wait(timeout=10)
+        return score_records(records)
+
+    class RecordingQueue(asyncio.Queue):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            queues.append(self)
+
+    monkeypatch.setattr(main, "_score_records", held_score_records)
+    monkeypatch.setattr(main.asyncio, "Queue", RecordingQueue)
+    return release, batch_sizes, queues
+
+
+def _wait_for(condition, timeout=5):
+    """Poll until condition() is true."""
+    import time
+
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out waiting for the stream"
+        time.sleep(0.01)
+
+
+def test_websocket_stream_batches_queued_messages(monkeypatch):
+    """Test that messages queued while a batch is scored go through the model as one batch."""
+    release, batch_sizes, queues = _hold_stream_scoring(monkeypatch)
+
+    with client.websocket_connect("/ws/predict") as websocket:
+        websocket.send_json({"id": 0, "data": SAMPLE_RECORD})
+        _wait_for(lambda: batch_sizes == [1])
+
+        for message_id in range(1, 6):
+            websocket.send_json({"id": message_id, "data": SAMPLE_RECORD})
+        _wait_for(lambda: queues[-1].qsize() == 5)
+        release.set()
+
+        replies = [websocket.receive_json() for _ in range(6)]
+
+    assert batch_sizes == [1, 5]
+    assert [reply["id"] for reply in replies] == list(range(6))
+    assert all(reply["prediction"] in [0, 1] for reply in replies)
+
+
+def test_websocket_stream_backpressure(monkeypatch):
+    """Test that a full stream queue stops reading from the client instead of growing."""
+    import time
+    import main
+
+    monkeypatch.setattr(main, "WS_QUEUE_SIZE", 2)
+    release, batch_sizes, queues = _hold_stream_scoring(monkeypatch)
+    parsed = []
+    parse_stream_message = main._parse_stream_message
+
+    def counting_parse(text):
+        parsed.append(text)
+        return parse_stream_message(text)
+
+    monkeypatch.setattr(main, "_parse_stream_message", counting_parse)
+
+    with client.websocket_connect("/ws/predict") as websocket:
+        websocket.send_json({"id": 0, "data": SAMPLE_RECORD})
+        _wait_for(lambda: batch_sizes == [1])
+
+        for message_id in range(1, 7):
+            websocket.send_json({"id": message_id, "data": SAMPLE_RECORD})
+        # Two messages fill the queue and the reader waits to put a third
+        _wait_for(lambda: len(parsed) == 4)
+        time.sleep(0.2)
+        assert queues[-1].qsize() == 2
+        assert len(parsed) == 4
+
+        release.set()
+        replies = [websocket.receive_json() for _ in range(7)]
+
+    assert [reply["id"] for reply in replies] == list(range(7))
+    assert len(parsed) == 7
+    assert all(size <= 2 for size in batch_sizes[1:])
+
+
+def test_websocket_stream_closes_when_scorer_fails(monkeypatch):
+    """Test that a reader waiting on a full queue gives up when the scorer dies instead of blocking forever."""
+    import main
+    from fastapi import WebSocketDisconnect
+
+    async def failing_score_stream(websocket, pending, send_lock):
+        await pending.get()
+        # Fail once the reader is waiting to put into the full queue, as on a failed send
+        while not pending.full():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        raise RuntimeError("Cannot send reply")
+
+    monkeypatch.setattr(main, "WS_QUEUE_SIZE", 1)
+    monkeypatch.setattr(main, "_score_stream", failing_score_stream)
+
+    with client.websocket_connect("/ws/predict") as websocket:
+        for message_id in range(3):
+            websocket.send_json({"id": message_id, "data": SAMPLE_RECORD})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+
+    assert closed.value.code == 1011
+
+
+def test_slice_job_runs_in_background_and_caches(tmp_path, monkeypatch):
+    """Test that slice jobs report progress, return JSON results and are cached."""
+    import time
+    import main
+
+    monkeypatch.setattr(main, "SLICE_DATA_DIR", str(tmp_path))
+    dataset = tmp_path / "slice_sample.csv"
+    with open("census.csv") as f:
+        dataset.write_text("".join(f.readline() for _ in range(300)))
+    request = {"dataset": "slice_sample.csv", "features": ["sex", "race"]}
+
+    response = client.post("/slices/jobs", json=request)
+    assert response.status_code in [200, 202]
+    job = response.json()
+    assert job["progress"]["total"] == 2
+
+    deadline = time.time() + 60
+    while job["status"] in ["queued", "running"] and time.time() < deadline:
+        time.sleep(0.1)
+        job = client.get(f"/slices/jobs/{job['job_id']}").json()
+
+    assert job["status"] == "completed"
+    assert job["progress"]["completed"] == 2
+    assert set(job["result"]) == {"race", "sex"}
+    for metrics in job["result"]["sex"].values():
+        assert set(metrics) == {"accuracy", "precision", "recall", "f1", "count"}
+
+    # Same model, dataset content and features (in any order) are answered from the cache
+    cached = client.post("/slices/jobs", json={"dataset": "slice_sample.csv", "features": ["race", "sex"]})
+    assert cached.status_code == 200
+    assert cached.json()["cached"] is True
+    assert cached.json()["result"] == job["result"]
+
+
+def test_slice_job_errors(tmp_path, monkeypatch):
+    """Test slice job validation and unknown job ids."""
+    import main
+
+    response = client.post("/slices/jobs", json={"dataset": "missing.csv", "features": ["sex"]})
+    assert response.status_code == 404
+
+    # Paths outside the data directory are rejected without revealing whether they exist
+    monkeypatch.setattr(main, "SLICE_DATA_DIR", str(tmp_path))
+    outside = os.path.abspath("census.csv")
+    for dataset in [outside, "../" + os.path.basename(tmp_path) + "/../x.csv", "../../../etc/passwd"]:
+        response = client.post("/slices/jobs", json={"dataset": dataset, "features": ["sex"]})
+        assert response.status_code == 400
+
+    response = client.get("/slices/jobs/does-not-exist")
+    assert response.status_code == 404
+
+
+def test_slice_job_model_version_includes_encoders(tmp_path, monkeypatch):
+    """Test that re-fitted encoders change the model version that slice results are cached under."""
+    import shutil
+    import main
+
+    model_path, encoder_path = tmp_path / "model.pkl", tmp_path / "encoders.pkl"
+    shutil.copy(main.MODEL_PATH, model_path)
+    shutil.copy(main.ENCODER_PATH, encoder_path)
+    monkeypatch.setattr(main, "MODEL_PATH", str(model_path))
+    monkeypatch.setattr(main, "ENCODER_PATH", str(encoder_path))
+
+    versions = []
+
+    def recording_submit(dataset, features, model_version, dataset_hash):
+        versions.append(model_version)
+        return {"status": "queued"}
+
+    monkeypatch.setattr(main.slice_jobs, "submit", recording_submit)
+    request = {"dataset": "census.csv", "features": ["sex"]}
+
+    client.post("/slices/jobs", json=request)
+    client.post("/slices/jobs", json=request)
+    with open(encoder_path, "ab") as f:
+        f.write(b"\n")
+    client.post("/slices/jobs", json=request)
+
+    assert versions[0] == versions[1] != versions[2]
+
+
+def test_feedback_rolling_metrics(monkeypatch):
+    """Test that delayed labels join to predictions and update rolling metrics."""
+    import main
+
+    monkeypatch.setattr(main, "feedback_tracker", FeedbackTracker(window=2))
+
+    scored = [client.post("/predict", json=SAMPLE_RECORD).json() for _ in range(3)]
+    request_ids = [item["request_id"] for item in scored]
+    assert len(set(request_ids)) == 3
+
+    # Label every prediction correctly, then report one id twice and an unknown id
+    feedback = [{"request_id": item["request_id"], "label": item["prediction_label"]} for item in scored]
+    feedback += [{"request_id": request_ids[0], "label": 1}, {"request_id": "unknown", "label": 0}]
+    response = client.post("/feedback", json={"feedback": feedback})
+    assert response.status_code == 200
+    assert response.json() == {"matched": 3, "unmatched": [request_ids[0], "unknown"]}
+
+    metrics = client.get("/feedback/metrics").json()
+    assert metrics["labelled"] == 2
+    assert metrics["accuracy"] == 1.0
+    assert metrics["pending"] == 0
+    assert metrics["matched"] == 3
+    assert metrics["unmatched"] == 2
+
+
+def test_feedback_tracker_window_and_bounds():
+    """Test O(1) window updates and bounded pending index."""
+    tracker = FeedbackTracker(max_pending=2, window=3)
+    for request_id, prediction in [("a", 1), ("b", 0), ("c", 1)]:
+        tracker.register(request_id, prediction)
+    assert tracker.metrics()["pending"] == 2
+    assert tracker.metrics()["evicted"] == 1
+    assert not tracker.record("a", 1)
+
+    for i, (prediction, label) in enumerate([(1, 1), (1, 0), (0, 1), (0, 0), (1, 1)]):
+        tracker.register(str(i), prediction)
+        assert tracker.record(str(i), label)
+
+    # Only the last three pairs remain: (0, 1), (0, 0), (1, 1)
+    metrics = tracker.metrics()
+    assert metrics["confusion"] == {"tp": 1, "fp": 0, "fn": 1, "tn": 1}
+    assert metrics["accuracy"] == pytest.approx(2 / 3)
+    assert metrics["precision"] == 1.0
+    assert metrics["recall"] == 0.5
+    assert metrics["f1"] == pytest.approx(2 / 3)
+
+
 def test_api_docs():
     """Test that API documentation is accessible."""
     response = client.get("/docs")
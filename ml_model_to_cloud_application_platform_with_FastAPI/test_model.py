@@ -8,6 +8,7 @@ import numpy as np
 import os
 import tempfile
 from model import CensusModel
+from inference import CensusPredictor
 
 
 class TestCensusModel:
@@ -165,6 +166,43 @@ class TestCensusModel:
                 else:
                     assert 0 <= value <= 1
 
+    def test_export_predictor(self):
+        """Test that the numpy-only predictor matches the trained model."""
+        X, y = self.model.preprocess_data(self.sample_data)
+        self.model.train(X, y)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = os.path.join(temp_dir, 'test_model.pkl')
+            encoder_path = os.path.join(temp_dir, 'test_encoders.pkl')
+            predictor_path = os.path.join(temp_dir, 'test_model.npz')
+
+            self.model.save_model(model_path, encoder_path, predictor_path)
+            assert os.path.exists(predictor_path)
+
+            predictor = CensusPredictor.load(predictor_path)
+            records = self.sample_data.drop('income', axis=1).to_dict('records')
+            predictions = predictor.predict(records)
+
+            np.testing.assert_array_equal(predictions, self.model.predict(self.sample_data))
+
+    def test_slice_performance_uses_trained_encoders(self):
+        """Test that slicing another dataset keeps the trained encoders and category codes."""
+        X, y = self.model.preprocess_data(self.sample_data)
+        self.model.train(X, y)
+        classes = {col: list(encoder.classes_) for col, encoder in self.model.label_encoders.items()}
+
+        # Without 'State-gov', re-fitted encoders would shift the workclass codes
+        subset = self.sample_data.iloc[1:]
+        slice_performance = self.model.get_slice_performance(subset, 'workclass')
+
+        assert {col: list(encoder.classes_) for col, encoder in self.model.label_encoders.items()} == classes
+        predictions = self.model.predict(subset)
+        for workclass, metrics in slice_performance.items():
+            mask = (subset['workclass'] == workclass).to_numpy()
+            expected = np.mean(predictions[mask] == self.model.label_encoders['income'].transform(subset['income'])[mask])
+            assert metrics['accuracy'] == pytest.approx(expected)
+            assert metrics['count'] == mask.sum()
+
     def test_predict_without_training(self):
         """Test that prediction fails when model is not trained."""
         with pytest.raises(ValueError, match="Model must be trained before making predictions"):
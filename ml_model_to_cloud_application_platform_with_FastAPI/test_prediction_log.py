@@ -0,0 +1,75 @@
+"""
+Unit tests for the background prediction logger
+"""
+
+import glob
+import os
+import tempfile
+
+import pandas as pd
+import pytest
+from model import CensusModel
+from prediction_log import PredictionLogger
+
+
+RECORD = {
+    "age": 39,
+    "workclass": "State-gov",
+    "fnlgt": 77516,
+    "education": "Bachelors",
+    "education-num": 13,
+    "marital-status": "Never-married",
+    "occupation": "Adm-clerical",
+    "relationship": "Not-in-family",
+    "race": "White",
+    "sex": "Male",
+    "capital-gain": 2174,
+    "capital-loss": 0,
+    "hours-per-week": 40,
+    "native-country": "United-States"
+}
+
+
+def test_logs_are_loadable_for_retraining():
+    """Test that rotated log files load through CensusModel.load_data/preprocess_data."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logger = PredictionLogger(temp_dir, batch_size=10, flush_interval=0.05, max_rows_per_file=20)
+        logger.start()
+        for i in range(50):
+            logger.log(RECORD, ">50K" if i % 2 else "<=50K")
+        logger.stop()
+
+        files = sorted(glob.glob(os.path.join(temp_dir, "*.csv.gz")))
+        assert len(files) > 1
+        assert logger.stats()["written"] == 50
+
+        model = CensusModel()
+        df = pd.concat([model.load_data(path) for path in files], ignore_index=True)
+        assert len(df) == 50
+        assert df.iloc[0]["education"] == "Bachelors"
+        assert set(df["income"]) == {">50K", "<=50K"}
+
+        X, y = model.preprocess_data(df)
+        assert len(X) == len(y) == 50
+
+
+def test_drops_when_buffer_full():
+    """Test that logging never blocks and drops records once the buffer is full."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logger = PredictionLogger(temp_dir, max_buffer=5)
+
+        results = [logger.log(RECORD, "<=50K") for _ in range(8)]
+
+        assert results == [True] * 5 + [False] * 3
+        stats = logger.stats()
+        assert stats["buffered"] == 5
+        assert stats["dropped"] == 3
+
+        # Buffered records are still flushed on shutdown
+        logger.start()
+        logger.stop()
+        assert logger.stats()["written"] == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])